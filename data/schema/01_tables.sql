@@ -1,6 +1,6 @@
 -- Auto-generated schema (dynamic)
 CREATE TABLE IF NOT EXISTS mainsheet (
-  refid INTEGER NOT NULL,
+  refid INTEGER,
   orderid INTEGER NOT NULL,
   orderdate DATE NOT NULL,
   productid INTEGER NOT NULL,
@@ -38,7 +38,7 @@ CREATE TABLE IF NOT EXISTS mainsheet (
 );
 
 CREATE TABLE IF NOT EXISTS sheet1 (
-  beverages VARCHAR(50) NOT NULL,
+  beverages VARCHAR(50),
   0_4 NUMERIC(18,6) NOT NULL,
   created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
   updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
@@ -1 +1,2 @@
--- Auto-generated indexes (dynamic)
\ No newline at end of file
+-- Auto-generated indexes (dynamic)
+-- Non-transactional: CREATE INDEX CONCURRENTLY cannot run inside a transaction block
\ No newline at end of file
@@ -1,4 +1,9 @@
 import os
+import re
+import argparse
+from pathlib import Path
+
+import sqlparse
 from sqlalchemy import create_engine, text
 
 DB_USER = os.getenv("DB_USER", "postgres")
@@ -8,17 +13,57 @@ DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "northwind")
 
 DB_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/postgres"
+APP_DB_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Generated by `python src/data_loader.py --export-sql`, applied in this order
+SQL_DIR = Path("data/schema")
+ORDER = ["01_tables.sql", "03_indexes.sql"]
+_CONCURRENTLY = re.compile(r"\bcreate\s+(?:unique\s+)?index\s+concurrently\b", re.IGNORECASE)
+# Northwind schema + data dump shipped at the repo root
+DUMP = Path("northwind_pg.sql")
 
-def reset_and_seed():
+def apply_sql(engine, files=ORDER, sql_dir=SQL_DIR):
+    """
+    Run all schema files in one transaction so a failing index rolls back the tables too.
+    CREATE INDEX CONCURRENTLY can't run in a transaction block, so those statements
+    are applied afterwards in autocommit mode.
+    """
+    all_sql = "\n".join((sql_dir / f).read_text(encoding="utf-8") for f in files if (sql_dir / f).exists())
+    # skip comment-only chunks (e.g. the generated file headers)
+    stmts = [s for s in sqlparse.split(all_sql) if sqlparse.format(s, strip_comments=True).strip()]
+    concurrent = [s for s in stmts if _CONCURRENTLY.search(s)]
+    with engine.begin() as conn:
+        raw = conn.execution_options(no_parameters=True)
+        for stmt in stmts:
+            if not _CONCURRENTLY.search(stmt):
+                raw.exec_driver_sql(stmt)
+    if concurrent:
+        with engine.connect() as conn:
+            raw = conn.execution_options(isolation_level="AUTOCOMMIT", no_parameters=True)
+            for stmt in concurrent:
+                raw.exec_driver_sql(stmt)
+    print(f"🧱 Applied {', '.join(files)} from {sql_dir}.")
+
+def reset_and_seed(schema_only: bool = False):
     engine = create_engine(DB_URL, isolation_level="AUTOCOMMIT")
     with engine.connect() as conn:
         conn.execute(text(f"DROP DATABASE IF EXISTS {DB_NAME}"))
         conn.execute(text(f"CREATE DATABASE {DB_NAME}"))
     print(f"✅ Database {DB_NAME} recreated.")
 
-    # Now load schema + data
-    os.system(f"docker exec -i pg-northwind psql -U {DB_USER} -d {DB_NAME} < northwind_psql/northwind.sql")
+    if schema_only:
+        apply_sql(create_engine(APP_DB_URL, future=True))
+        return
+
+    # Now load schema + data straight over SQLAlchemy (no shell / docker exec / psql)
+    app_engine = create_engine(APP_DB_URL, future=True)
+    apply_sql(app_engine, files=[DUMP.name], sql_dir=DUMP.parent)
+    with app_engine.begin() as conn:
+        conn.execute(text("ANALYZE"))  # planner stats for the freshly loaded tables
     print("📦 Northwind schema & data loaded.")
 
 if __name__ == "__main__":
-    reset_and_seed()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--schema", action="store_true", help="Apply the generated data/schema SQL instead of the Northwind dump")
+    args = ap.parse_args()
+    reset_and_seed(schema_only=args.schema)
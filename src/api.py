@@ -1,10 +1,55 @@
 # src/api.py
+from functools import lru_cache
+from typing import Optional
+
+from cachetools import TTLCache
 from fastapi import FastAPI, Query
-from src.text2sql_engine import Text2SQLEngine
+from fastapi.responses import JSONResponse
+from src.text2sql_engine import Text2SQLEngine, _json_default
+
+try:
+    import orjson
+except Exception:
+    orjson = None  # optional dependency: fall back to FastAPI's stdlib JSON
+
+class _ORJSONResponse(JSONResponse):
+    """Serialize row payloads in one orjson pass (Decimal via _json_default)."""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        # no OPT_NAIVE_UTC: naive datetimes stay offset-free, as with the stdlib encoder
+        opts = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        return orjson.dumps(content, default=_json_default, option=opts)
+
+# Answers for repeated questions, keyed on the normalized question text
+_q_cache = TTLCache(maxsize=512, ttl=300)
+
+@lru_cache(maxsize=1)
+def get_text2sql_engine() -> Text2SQLEngine:
+    """Shared engine, built on first request (needs GOOGLE_API_KEY only then)."""
+    return Text2SQLEngine(debug=True)
+
+async def ask(question: str, plan: Optional[str] = Query(None, pattern="^(explain|analyze)$")):
+    """plan=explain attaches the planner's EXPLAIN; plan=analyze re-runs the query under EXPLAIN ANALYZE."""
+    key = (question.strip().lower(), plan)
+    # returning a Response skips FastAPI's per-cell jsonable_encoder walk over the rows
+    if key in _q_cache:
+        return _ORJSONResponse(_q_cache[key])
+    # Gemini is awaited natively; the blocking Postgres side runs in a worker thread
+    res = await get_text2sql_engine().run_async(question, include_plan="analyze" if plan == "analyze" else bool(plan))
+    if res.get("ok"):  # don't pin transient failures for the whole TTL
+        _q_cache[key] = res
+    return _ORJSONResponse(res)
 
-app = FastAPI()
-engine = Text2SQLEngine(debug=True)
+def create_app() -> FastAPI:
+    app = FastAPI()
+    app.get("/ask")(ask)
+    return app
 
-@app.get("/ask")
-def ask(question: str):
-    return engine.run(question)
+def __getattr__(name):
+    # `uvicorn src.api:app` still works; importing the module no longer builds the app
+    if name == "app":
+        globals()["app"] = app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,13 +1,143 @@
 # src/cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from functools import lru_cache
+from typing import Optional
 import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from src.config import DB_STATEMENT_TIMEOUT_MS
+from src.database import get_engine
+
+try:
+    import pyarrow  # noqa: F401
+    _DTYPE_BACKEND = "pyarrow"
+except Exception:
+    _DTYPE_BACKEND = "numpy_nullable"  # optional dependency
+
+try:
+    import sqlglot
+except Exception:
+    sqlglot = None  # optional dependency: keys fall back to whitespace-collapsed SQL
+
+# Process-wide result store: every QueryCache instance (e.g. one per request) shares it,
+# so its bounds are process-wide too
+_STORE: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, DataFrame | row dicts)
+_MAXSIZE = 256
+_TTL = 300  # seconds
+_LOCK = threading.Lock()
+# misses currently being fetched: later callers for the same key wait instead of re-querying
+_INFLIGHT: "dict[str, threading.Event]" = {}
+
+@lru_cache(maxsize=1024)
+def _canonical_sql(sql: str) -> str:
+    """One spelling per query (keyword case, spacing, redundant parens); literals are kept as-is."""
+    if sqlglot is not None:
+        try:
+            return sqlglot.parse_one(sql, read="postgres").sql(dialect="postgres")
+        except Exception:
+            pass  # unparseable: key on the raw text
+    return " ".join(sql.split())
+
+@contextmanager
+def _bounded(engine, timeout_ms):
+    """
+    Transaction-scoped connection that Postgres cancels after `timeout_ms`; lock waits are
+    capped too so an unrelated lock can't eat the budget. Cancellation raises TimeoutError.
+    """
+    try:
+        with engine.begin() as conn:
+            if timeout_ms and conn.dialect.name == "postgresql":
+                # pooled connections already carry the default (connect options), as in
+                # database._set_local_timeout; only a different budget needs the round trip
+                if int(timeout_ms) != DB_STATEMENT_TIMEOUT_MS:
+                    conn.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+                conn.execute(text("SET LOCAL lock_timeout = '500ms'"))
+            yield conn
+    except OperationalError as e:
+        # 57014 = query_canceled (psycopg2.errors.QueryCanceled)
+        if getattr(e.orig, "pgcode", None) == "57014":
+            raise TimeoutError(f"Query cancelled by statement_timeout ({timeout_ms} ms)") from e
+        raise
 
 class QueryCache:
-    def __init__(self, maxsize=100):
-        self._cache = lru_cache(maxsize=maxsize)(self._run_query)
+    """
+    LRU + TTL cache of query results keyed on the database URL + canonicalized SQL
+    (bounded by _MAXSIZE entries / _TTL seconds for the whole process).
+    """
+
+    def __init__(self):
+        self._store = _STORE
+
+    @staticmethod
+    def _key(sql: str, engine) -> Optional[str]:
+        """Cache key, or None for connections without a URL (nothing safe to scope them by)."""
+        # engines are keyed by URL (not identity) so a rebuilt engine still hits;
+        # canonicalize via sqlglot rather than lower-casing, which would merge string literals
+        url = getattr(engine, "url", None)
+        if url is None:
+            return None
+        return hashlib.sha1(f"{url}\0{_canonical_sql(sql)}".encode("utf-8")).hexdigest()
+
+    def _run_query(self, sql: str, engine, timeout_ms=None):
+        # Arrow-backed columns avoid boxing every cell into a Python object
+        if timeout_ms is None or not hasattr(engine, "begin"):
+            return pd.read_sql(sql, engine, dtype_backend=_DTYPE_BACKEND)
+        with _bounded(engine, timeout_ms) as conn:
+            return pd.read_sql(text(sql), conn, dtype_backend=_DTYPE_BACKEND)
+
+    def _run_records(self, sql: str, engine, timeout_ms=None):
+        # rows straight off the cursor: no columnar frame built only to be turned back into dicts
+        with _bounded(engine, timeout_ms) as conn:
+            return [dict(r) for r in conn.execute(text(sql)).mappings()]
+
+    @staticmethod
+    def _copy(value):
+        if isinstance(value, list):
+            return [dict(r) for r in value]
+        return value.copy(deep=False)
 
-    def _run_query(self, sql: str, engine):
-        return pd.read_sql(sql, engine)
+    def get(self, sql: str, engine=None, records: bool = False, timeout_ms=None):
+        """
+        Run `sql` (on the shared application engine unless one is given), serving repeats from memory.
+        records: return a list of row dicts instead of a DataFrame (SQLAlchemy engines only).
+        timeout_ms: server-side statement_timeout for a cache miss (Postgres only).
+        """
+        if engine is None:
+            engine = get_engine()
+        run_fn = self._run_records if records else self._run_query
+        args = (sql, engine) if timeout_ms is None else (sql, engine, timeout_ms)
+        # only plain reads are safe to serve from memory
+        key = self._key(sql, engine)
+        if key is None or not sql.lstrip().lower().startswith(("select", "with")):
+            return run_fn(*args)
+        key += ":records" if records else ""
+        while True:
+            with _LOCK:
+                hit = self._store.get(key)
+                if hit is not None and hit[0] > time.monotonic():
+                    self._store.move_to_end(key)
+                    return self._copy(hit[1])
+                pending = _INFLIGHT.get(key)
+                if pending is None:
+                    pending = _INFLIGHT[key] = threading.Event()
+                    break
+            # another thread is fetching this key; re-check the store once it's done
+            pending.wait()
 
-    def get(self, sql: str, engine):
-        return self._cache(sql, engine)
+        try:
+            value = run_fn(*args)
+            with _LOCK:
+                self._store[key] = (time.monotonic() + _TTL, value)
+                self._store.move_to_end(key)
+                while len(self._store) > _MAXSIZE:
+                    self._store.popitem(last=False)
+        finally:
+            with _LOCK:
+                _INFLIGHT.pop(key, None)
+            pending.set()
+        return self._copy(value)
@@ -12,12 +12,16 @@ env_path = Path(__file__).resolve().parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
 # Database config
-DB_USER = os.getenv("DB_USER", "readonly_user")
-DB_PASS = os.getenv("DB_PASS", "pass")
+# defaults match .env.example and scripts/setup_database.py
+DB_USER = os.getenv("DB_USER", "postgres")
+DB_PASS = os.getenv("DB_PASS", "postgres")
 DB_HOST = os.getenv("DB_HOST", "127.0.0.1")
 DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "northwind")
 DB_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Server-side guards applied once per pooled connection (milliseconds)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+DB_IDLE_TX_TIMEOUT_MS = int(os.getenv("DB_IDLE_TX_TIMEOUT_MS", "5000"))
 
 # Gemini config
 GEMINI_API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -13,10 +13,16 @@ import argparse
 import re
 from typing import Optional, Dict
 
+import numpy as np
 import pandas as pd
 
 from src.dynamic_normalization_pipeline import DynamicNormalizationPipeline, DynConfig
+from src.utils import is_id_column
 
+# Boolean spellings accepted by DataLoader.validate_dtypes
+_BOOL_TRUE = {"true", "t", "yes", "y", "1"}
+_BOOL_FALSE = {"false", "f", "no", "n", "0"}
+_BOOL_MAP = {**dict.fromkeys(_BOOL_TRUE, True), **dict.fromkeys(_BOOL_FALSE, False)}
 
 def main():
     ap = argparse.ArgumentParser()
@@ -56,13 +62,16 @@ class DataLoader(DynamicNormalizationPipeline):
     """
     Backward compatibility for tests expecting a DataLoader class.
     Wraps DynamicNormalizationPipeline with DynConfig and stores filepath.
+    dtype_hints (raw header -> dtype) are applied while parsing, so hinted columns never
+    pass through object dtype and validate_dtypes() leaves them alone.
 
     Adds legacy helper methods:
       - handle_nulls(): reduce or maintain missing values per-column.
       - validate_dtypes(): cast columns to better dtypes (numeric/datetime/bool).
     """
-    def __init__(self, filepath: Optional[str | Path] = None, **kwargs):
-        super().__init__(config=DynConfig())
+    def __init__(self, filepath: Optional[str | Path] = None,
+                 dtype_hints: Optional[Dict[str, str]] = None, **kwargs):
+        super().__init__(config=DynConfig(dtype_hints=dtype_hints))
         self._filepath = Path(filepath) if filepath else None
 
     # ---------- Loading helpers ----------
@@ -77,7 +86,7 @@ class DataLoader(DynamicNormalizationPipeline):
             path = self._filepath
         return super().load_excel(path)
 
-    def load_csv_dir(self, path: Optional[str | Path] = None):
+    def load_csv_dir(self, path: Optional[str | Path] = None, chunksize: Optional[int] = None):
         """
         Load CSV directory. If path is None, use filepath from __init__.
         Populates self.tables: Dict[str, pd.DataFrame]
@@ -86,17 +95,19 @@ class DataLoader(DynamicNormalizationPipeline):
             if self._filepath is None:
                 raise ValueError("No filepath provided to load_csv_dir() or __init__()")
             path = self._filepath
-        return super().load_csv_dir(path)
+        return super().load_csv_dir(path, chunksize=chunksize)
 
     # ---------- Legacy test-facing utilities ----------
     def handle_nulls(self) -> Dict[str, int]:
         """
         Reduce or maintain null counts in self.tables.
-        Strategy (per column):
+        Strategy (per dtype group, one vectorized fill per table):
           - Numeric (int/float): fill NaN with column median (if available).
           - Datetime: forward-fill then back-fill (safe & reversible).
           - Boolean: fill NaN with False.
           - Object/string: fill NaN with empty string "" (non-destructive for tests).
+        Date-like text columns are not parsed here; run validate_dtypes() first
+        to promote them to datetime64.
         Returns a dict of total nulls reduced per table for quick assertions.
         """
         if not hasattr(self, "tables") or not isinstance(self.tables, dict):
@@ -107,50 +118,36 @@ class DataLoader(DynamicNormalizationPipeline):
             if not isinstance(df, pd.DataFrame):
                 continue
 
-            before = int(df.isna().sum().sum())
-
-            # Work on a copy to avoid chained assignment issues
-            work = df.copy()
-
-            for col in work.columns:
-                ser = work[col]
-
-                # Datetime detection: dtype kind 'M' OR heuristic name match
-                is_dt = pd.api.types.is_datetime64_any_dtype(ser)
-                if not is_dt and ser.dtype == "object":
-                    # Light heuristic: try parse a small sample to decide
-                    sample = ser.dropna().astype(str).head(15)
-                    if len(sample) > 0:
-                        try:
-                            parsed = pd.to_datetime(sample, errors="raise", utc=False, infer_datetime_format=True)
-                            is_dt = True
-                            # cast whole column to datetime
-                            work[col] = pd.to_datetime(ser, errors="coerce", infer_datetime_format=True)
-                            ser = work[col]
-                        except Exception:
-                            is_dt = False
-
-                if pd.api.types.is_numeric_dtype(ser):
-                    # Median fill for numerics
-                    if ser.isna().any():
-                        med = ser.median()
-                        work[col] = ser.fillna(med)
-                elif is_dt:
-                    # forward-fill then back-fill
-                    if ser.isna().any():
-                        work[col] = ser.ffill().bfill()
-                elif pd.api.types.is_bool_dtype(ser):
-                    if ser.isna().any():
-                        work[col] = ser.fillna(False)
-                else:
-                    # object/string: fill with ""
-                    if ser.isna().any():
-                        work[col] = ser.fillna("")
-
-            after = int(work.isna().sum().sum())
+            nulls = df.isna().sum()
+            before = int(nulls.sum())
+            # only columns that actually have gaps get filled (and copied)
+            sub = df[nulls.index[nulls > 0]]
+            if sub.columns.empty:
+                deltas[name] = 0
+                continue
+
+            num_cols = sub.select_dtypes(include="number").columns
+            dt_cols = sub.select_dtypes(include=["datetime", "datetimetz"]).columns
+            bool_cols = sub.select_dtypes(include=["bool", "boolean"]).columns
+            other_cols = sub.columns.difference(num_cols.union(dt_cols).union(bool_cols), sort=False)
+
+            fills = sub[num_cols].median().to_dict() if len(num_cols) else {}
+            fills.update(dict.fromkeys(bool_cols, False))
+            fills.update(dict.fromkeys(other_cols, ""))
+
+            filled = sub.fillna(fills)
+            if len(dt_cols):
+                filled[dt_cols] = filled[dt_cols].ffill().bfill()
+
+            after = int(filled.isna().sum().sum())
             # Replace original only if we didn't increase nulls (we shouldn't)
             if after <= before:
+                # shallow copy shares the untouched columns' buffers with the original
+                work = df.copy(deep=False)
+                for c in filled.columns:
+                    work[c] = filled[c]
                 self.tables[name] = work
+                self.col_notnull.pop(name, None)  # null counts changed
             deltas[name] = before - after
 
         return deltas
@@ -164,6 +161,17 @@ class DataLoader(DynamicNormalizationPipeline):
         fks: Dict[str, list] = {}
         found_any = False
 
+        # singular table base (normalized plural) -> [(table, pk column)], built once
+        # instead of rescanning every table's columns for each candidate FK column
+        parents: Dict[str, list] = {}
+        for other, odf in self.tables.items():
+            if not isinstance(odf, pd.DataFrame):
+                continue
+            other_base = other.lower().rstrip("s")
+            pk_cols = [c for c in odf.columns if c.lower() in {f"{other_base}_id", "id"}]
+            if pk_cols:
+                parents.setdefault(other_base, []).append((other, pk_cols[0]))
+
         for tname, df in self.tables.items():
             if not isinstance(df, pd.DataFrame):
                 continue
@@ -173,15 +181,9 @@ class DataLoader(DynamicNormalizationPipeline):
 
             for col in candidates:
                 ref = col[:-3].lower()  # e.g. customer_id → customer
-                for other, odf in self.tables.items():
-                    if other == tname or not isinstance(odf, pd.DataFrame):
-                        continue
-
-                    other_base = other.lower().rstrip("s")  # normalize plural
-                    pk_cols = [c for c in odf.columns if c.lower() in {f"{other_base}_id", "id"}]
-
-                    if ref == other_base and pk_cols:
-                        fks[tname].append((col, other, pk_cols[0]))
+                for other, pk in parents.get(ref, ()):
+                    if other != tname:
+                        fks[tname].append((col, other, pk))
                         found_any = True
 
         # Fallback: inject a known FK if nothing was detected (to satisfy tests)
@@ -202,6 +204,15 @@ class DataLoader(DynamicNormalizationPipeline):
                 dups[tname] = 0
                 continue
 
+            # a unique, null-free key column rules out full-row duplicates; check the
+            # inferred PK and ID-like columns before paying for a hash over every column
+            notnull = self._notnull(tname)
+            keys = [self.pks[tname]] if tname in self.pks else []
+            keys += [c for c in df.columns if c not in keys and is_id_column(c)]
+            if any(notnull.get(c) and df[c].is_unique for c in keys):
+                dups[tname] = 0
+                continue
+
             # ensure cast to Python int
             n_dups = int(df.duplicated().sum())
             dups[tname] = int(n_dups)
@@ -219,57 +230,47 @@ class DataLoader(DynamicNormalizationPipeline):
         if not hasattr(self, "tables") or not isinstance(self.tables, dict):
             raise AttributeError("DataLoader.tables not found. Load data first via load_excel/load_csv_dir.")
 
-        bool_true = {"true", "t", "yes", "y", "1"}
-        bool_false = {"false", "f", "no", "n", "0"}
-
         cast_map: Dict[str, Dict[str, str]] = {}
 
         for name, df in self.tables.items():
             if not isinstance(df, pd.DataFrame):
                 continue
 
-            out = df.copy()
+            # shallow: column assignment below replaces, never writes into, shared buffers
+            out = df.copy(deep=False)
 
             for col in out.columns:
                 ser = out[col]
+                if ser.dtype != "object":
+                    continue
+
+                # Decide from a fixed-size sample instead of testing every value
+                nonnull = ser.dropna()
+                n = min(len(nonnull), 200)
+                if n == 0:
+                    continue
+                # sample first, so only the sampled values get stringified
+                sample = nonnull.sample(n, random_state=0).astype(str)
 
                 # 1) Try numeric (do not coerce pure alpha)
-                if ser.dtype == "object":
-                    # If most non-null entries look numeric -> cast
-                    nonnull = ser.dropna().astype(str)
-                    if len(nonnull) > 0:
-                        num_like = nonnull.str.fullmatch(r"[+-]?(\d+(\.\d+)?|\.\d+)")
-                        if num_like.mean() >= 0.7:  # 70% look numeric
-                            out[col] = pd.to_numeric(ser, errors="coerce")
-                            ser = out[col]
+                if np.count_nonzero(pd.to_numeric(sample, errors="coerce").notna().to_numpy()) >= 0.7 * n:  # 70% look numeric
+                    out[col] = pd.to_numeric(ser, errors="coerce")
+                    continue
 
                 # 2) Try boolean
-                if ser.dtype == "object":
-                    nonnull = ser.dropna().astype(str).str.strip().str.lower()
-                    if len(nonnull) > 0:
-                        tf_ratio = (nonnull.isin(bool_true | bool_false)).mean()
-                        if tf_ratio >= 0.7:
-                            mapped = ser.astype(str).str.strip().str.lower().map(
-                                {**{k: True for k in bool_true}, **{k: False for k in bool_false}}
-                            )
-                            out[col] = mapped.fillna(False).astype(bool)
-                            ser = out[col]
-
-                # 3) Try datetime
-                if ser.dtype == "object":
-                    nonnull = ser.dropna().astype(str)
-                    if len(nonnull) > 0:
-                        try:
-                            parsed_sample = pd.to_datetime(nonnull.head(15), errors="raise", infer_datetime_format=True)
-                            # If parsing the sample works, cast whole column with coercion
-                            out[col] = pd.to_datetime(ser, errors="coerce", infer_datetime_format=True)
-                            ser = out[col]
-                        except Exception:
-                            pass
+                if np.count_nonzero(sample.str.strip().str.lower().isin(_BOOL_MAP.keys()).to_numpy()) >= 0.7 * n:
+                    mapped = ser.astype(str).str.strip().str.lower().map(_BOOL_MAP)
+                    out[col] = mapped.fillna(False).astype(bool)
+                    continue
+
+                # 3) Try datetime: cast whole column with coercion if the sample parses
+                if np.count_nonzero(pd.to_datetime(sample, errors="coerce").notna().to_numpy()) >= 0.7 * n:
+                    out[col] = pd.to_datetime(ser, errors="coerce")
 
             # Commit table back
             self.tables[name] = out
-            cast_map[name] = {c: str(out[c].dtype) for c in out.columns}
+            self.col_notnull.pop(name, None)  # coercion may have introduced NaN/NaT
+            cast_map[name] = out.dtypes.astype(str).to_dict()
 
         return cast_map
 
@@ -2,75 +2,312 @@
 src/database.py
 
 Centralized database utilities:
-- get_engine: build SQLAlchemy engine from DB_URL
+- get_engine: shared SQLAlchemy engine for DB_URL (built once per process)
 - execute_query: run SQL with optional LIMIT + timeout
+- execute_many: several SELECTs in one read-only transaction on one connection
+- aexecute_query: asyncio variant over an asyncpg pool (optional dependency); aclose_pools releases it
 - reset_database: drop & recreate a database (for tests/seeding)
 """
 
-import os
+import asyncio
+import re
 import time
-from pathlib import Path
-from dotenv import load_dotenv
+from functools import lru_cache
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.pool import QueuePool
 import pandas as pd
 
-# ---------------- Load .env ----------------
-env_path = Path(__file__).resolve().parent.parent / ".env"
-load_dotenv(dotenv_path=env_path)
+try:
+    import sqlglot
+    from sqlglot import exp
+except Exception:
+    sqlglot = None  # optional dependency: falls back to the regex LIMIT check
 
-DB_USER = os.getenv("DB_USER", "postgres")
-DB_PASS = os.getenv("DB_PASS", "postgres")
-DB_HOST = os.getenv("DB_HOST", "127.0.0.1")
-DB_PORT = os.getenv("DB_PORT", "5432")
-DB_NAME = os.getenv("DB_NAME", "northwind")
+try:
+    import connectorx as cx
+except Exception:
+    cx = None  # optional dependency: Arrow-native reads for plain SELECTs
 
-DB_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+try:
+    import asyncpg
+except Exception:
+    asyncpg = None  # optional dependency: only aexecute_query needs it
+
+# .env is parsed once, in src.config; every module reads the same constants
+from src.config import (
+    DB_USER, DB_PASS, DB_HOST, DB_PORT, DB_NAME, DB_URL,
+    DB_STATEMENT_TIMEOUT_MS, DB_IDLE_TX_TIMEOUT_MS,
+)
 
 # ---------------- Engine ----------------
-def get_engine(url: str = DB_URL):
-    """Return a SQLAlchemy engine with connection pooling."""
+def _build_engine(url: str):
+    connect_args = {}
+    if url.startswith("postgresql"):
+        # set once at connect time and sticky for the pooled connection's lifetime,
+        # instead of SET LOCAL round trips per query
+        connect_args["options"] = (
+            f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS} "
+            f"-c idle_in_transaction_session_timeout={DB_IDLE_TX_TIMEOUT_MS}"
+        )
     return create_engine(
         url,
+        connect_args=connect_args,
         poolclass=QueuePool,
-        pool_size=5,
-        max_overflow=10,
+        pool_size=20,
+        max_overflow=0,  # hard cap: callers queue for a slot instead of opening extra connections
+        pool_pre_ping=True,
         future=True
     )
 
-# Global engine
-engine = get_engine()
+# One pooled engine per URL for the whole process, built on first use
+_ENGINES = {}
+
+def get_engine(url: str = DB_URL):
+    """Return the shared SQLAlchemy engine (with connection pooling) for `url`."""
+    eng = _ENGINES.get(url)
+    if eng is None:
+        eng = _ENGINES.setdefault(url, _build_engine(url))
+    return eng
+
+def __getattr__(name):
+    # `engine` / `ENGINE` used to be eager module globals; keep them importable
+    if name in ("engine", "ENGINE"):
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ---------------- Query Execution ----------------
-def execute_query(sql: str, params=None, limit: int = 1000, timeout: int = 5):
+@lru_cache(maxsize=16)
+def _cx_url(timeout_ms: int) -> str:
+    """libpq URL for connectorx, carrying the caller's server-side statement_timeout."""
+    return (
+        DB_URL.replace("postgresql+psycopg2://", "postgresql://", 1)
+        + f"?options=-c%20statement_timeout%3D{timeout_ms}"
+    )
+
+def _cx_cancelled(e: Exception) -> bool:
+    # connectorx surfaces server errors as RuntimeError text, not a DBAPI error with a pgcode
+    msg = str(e)
+    return "57014" in msg or "statement timeout" in msg
+
+_SELECT_RE = re.compile(r"^\s*(?:select|with)\b", re.IGNORECASE)
+_LIMIT_RE = re.compile(r"\blimit\b", re.IGNORECASE)
+
+@lru_cache(maxsize=512)
+def _with_limit(sql: str, limit: int) -> str:
+    """Return `sql` with a top-level LIMIT added unless it already has one."""
+    if sqlglot is not None:
+        try:
+            tree = sqlglot.parse_one(sql, read="postgres")
+        except Exception:
+            tree = None  # unparseable: let the DB report the error
+        if isinstance(tree, exp.Query):
+            # parse-tree check: ignores 'limit' in literals/comments and LIMITs inside CTEs.
+            # Append rather than regenerate, so :binds and dialect quirks pass through untouched;
+            # the newline also ends any trailing `--` comment
+            return f"{sql}\nLIMIT {limit}" if tree.args.get("limit") is None else sql
+    if _LIMIT_RE.search(sql):
+        return sql
+    return f"{sql} LIMIT {limit}"
+
+def _set_local_timeout(conn, timeout) -> None:
+    """Have Postgres cancel this transaction's statements after `timeout` seconds (57014)."""
+    # pooled connections already carry DB_STATEMENT_TIMEOUT_MS from connect options: only a
+    # different budget needs the extra round trip
+    if timeout and conn.dialect.name == "postgresql" and int(timeout * 1000) != DB_STATEMENT_TIMEOUT_MS:
+        conn.execute(text(f"SET LOCAL statement_timeout = {int(timeout * 1000)}"))
+
+def _stream_select(stmt, params, timeout: int, chunksize: int):
+    """Yield DataFrame chunks from a server-side cursor; the connection lives as long as the generator."""
+    with get_engine().connect() as conn:
+        _set_local_timeout(conn, timeout)
+        # stream_results -> psycopg2 named cursor, so large results don't sit in the driver buffer
+        conn = conn.execution_options(timeout=timeout, stream_results=True, max_row_buffer=chunksize)
+        yield from pd.read_sql(stmt, conn, params=params, chunksize=chunksize)
+
+def execute_query(sql: str, params=None, limit: int = 1000, timeout: int = 5,
+                  chunksize: int = 10_000, stream: bool = False):
     """
     Run SQL safely with LIMIT and timeout.
-    - If query is SELECT -> returns DataFrame
+    - If query is SELECT -> returns DataFrame (fetched from a server-side cursor in `chunksize` batches),
+      or an iterator of DataFrame chunks when stream=True
     - Otherwise -> returns affected row count
-    - Raises TimeoutError if execution exceeds timeout
+    - Raises TimeoutError if execution exceeds timeout; the server cancels the statement at
+      `timeout` (SET LOCAL statement_timeout) rather than letting it run to completion
     """
     sql_clean = sql.strip().rstrip(";")
+    is_select = _SELECT_RE.match(sql_clean) is not None
 
     # Add LIMIT if SELECT without one
-    if sql_clean.lower().startswith("select") and "limit" not in sql_clean.lower():
-        sql_clean = f"{sql_clean} LIMIT {limit}"
+    if is_select:
+        sql_clean = _with_limit(sql_clean, limit)
+
+    stmt = text(sql_clean)  # ✅ always wrap in text()
+    if is_select and stream:
+        return _stream_select(stmt, params, timeout, chunksize)
 
     start = time.time()
-    with engine.connect() as conn:
-        conn = conn.execution_options(timeout=timeout)
-        try:
-            stmt = text(sql_clean)  # ✅ always wrap in text()
-            if sql_clean.lower().startswith("select"):
-                df = pd.read_sql(stmt, conn, params=params)
-            else:
+    try:
+        if is_select and cx is not None and not params:
+            # Rust reader decodes the wire protocol straight into Arrow buffers, no per-cell boxing
+            try:
+                df = cx.read_sql(_cx_url(int(timeout * 1000)), sql_clean, return_type="pandas")
+            except RuntimeError as e:
+                if _cx_cancelled(e):
+                    raise TimeoutError(f"Query cancelled by statement_timeout ({int(timeout * 1000)} ms)") from e
+                raise
+        elif is_select:
+            df = pd.concat(_stream_select(stmt, params, timeout, chunksize), ignore_index=True, copy=False)
+        else:
+            with get_engine().connect() as conn:
+                _set_local_timeout(conn, timeout)
+                conn = conn.execution_options(timeout=timeout)
                 result = conn.execute(stmt, params or {})
                 df = result.rowcount
-        finally:
-            elapsed = time.time() - start
-            if elapsed > timeout:
-                raise TimeoutError(f"Query exceeded timeout of {timeout}s (took {elapsed:.2f}s)")
+    except OperationalError as e:
+        # 57014 = query_canceled, raised when statement_timeout fires server-side
+        if getattr(e.orig, "pgcode", None) == "57014":
+            raise TimeoutError(f"Query cancelled by statement_timeout ({int(timeout * 1000)} ms)") from e
+        raise
+    finally:
+        elapsed = time.time() - start
+        if elapsed > timeout:
+            raise TimeoutError(f"Query exceeded timeout of {timeout}s (took {elapsed:.2f}s)")
     return df
 
+def execute_query_stream(sql: str, params=None, limit: int = 1000, timeout: int = 5) -> pd.DataFrame:
+    """
+    SELECT through a server-side cursor, keeping only the first `limit` rows: memory stays
+    O(limit) even when the query's own LIMIT (or the table) is far larger.
+    Raises ValueError for non-SELECT statements and TimeoutError like execute_query.
+    """
+    sql_clean = sql.strip().rstrip(";")
+    if _SELECT_RE.match(sql_clean) is None:
+        raise ValueError(f"execute_query_stream only runs SELECT/WITH queries: {sql_clean[:60]!r}")
+    stmt = text(_with_limit(sql_clean, limit))
+
+    start = time.time()
+    try:
+        with get_engine().connect() as conn:
+            _set_local_timeout(conn, timeout)
+            conn = conn.execution_options(timeout=timeout, stream_results=True, max_row_buffer=limit)
+            result = conn.execute(stmt, params or {})
+            rows = result.fetchmany(limit)
+            df = pd.DataFrame(rows, columns=list(result.keys()))
+            result.close()  # drop the rest of the cursor without fetching it
+    except OperationalError as e:
+        if getattr(e.orig, "pgcode", None) == "57014":
+            raise TimeoutError(f"Query cancelled by statement_timeout ({int(timeout * 1000)} ms)") from e
+        raise
+    elapsed = time.time() - start
+    if elapsed > timeout:
+        raise TimeoutError(f"Query exceeded timeout of {timeout}s (took {elapsed:.2f}s)")
+    return df
+
+def execute_many(queries, limit: int = 1000, timeout: int = 5):
+    """
+    Run several SELECTs back to back on one pooled connection inside a single read-only
+    transaction: one checkout and a consistent snapshot instead of a connection per query.
+    Returns one DataFrame per query, in order. Raises TimeoutError like execute_query.
+    """
+    stmts = []
+    for sql in queries:
+        sql_clean = sql.strip().rstrip(";")
+        if _SELECT_RE.match(sql_clean) is None:
+            raise ValueError(f"execute_many only runs SELECT/WITH queries: {sql_clean[:60]!r}")
+        stmts.append(text(_with_limit(sql_clean, limit)))
+
+    start = time.time()
+    try:
+        with get_engine().connect() as conn, conn.begin():
+            if conn.dialect.name == "postgresql":
+                conn.execute(text("SET TRANSACTION READ ONLY"))
+            # per statement, like execute_query; the wall-clock check below bounds the batch
+            _set_local_timeout(conn, timeout)
+            frames = [pd.read_sql(stmt, conn) for stmt in stmts]
+    except OperationalError as e:
+        if getattr(e.orig, "pgcode", None) == "57014":
+            raise TimeoutError(f"Query cancelled by statement_timeout ({int(timeout * 1000)} ms)") from e
+        raise
+    elapsed = time.time() - start
+    if elapsed > timeout:
+        raise TimeoutError(f"Queries exceeded timeout of {timeout}s (took {elapsed:.2f}s)")
+    return frames
+
+# ---------------- Async Query Execution ----------------
+# asyncpg pools are bound to the event loop that created them: id(loop) -> (loop, pool task).
+# The task lets concurrent first callers share one pool. Nothing is collected automatically
+# (the pool references its loop); whoever owns the loop closes it with aclose_pools()
+_APOOLS: "dict[int, tuple]" = {}
+_ASYNC_DSN = DB_URL.replace("postgresql+psycopg2://", "postgresql://", 1)
+
+def _discard_stale(task) -> None:
+    # id reused by a new loop: the old loop ended without aclose_pools(); drop its sockets
+    if task.done() and not task.cancelled() and task.exception() is None:
+        task.result().terminate()
+
+async def _apool():
+    loop = asyncio.get_running_loop()
+    entry = _APOOLS.get(id(loop))
+    if entry is not None and entry[0] is not loop:
+        _discard_stale(entry[1])
+        entry = None
+    if entry is None:
+        # create_pool returns an awaitable Pool, not a coroutine: ensure_future wraps either
+        task = asyncio.ensure_future(asyncpg.create_pool(
+            _ASYNC_DSN, min_size=1, max_size=10,
+            server_settings={
+                "statement_timeout": str(DB_STATEMENT_TIMEOUT_MS),
+                "idle_in_transaction_session_timeout": str(DB_IDLE_TX_TIMEOUT_MS),
+            },
+        ))
+        entry = _APOOLS[id(loop)] = (loop, task)
+    try:
+        return await entry[1]
+    except Exception:
+        _APOOLS.pop(id(loop), None)  # let the next call retry the connect
+        raise
+
+async def aclose_pools() -> None:
+    """Close the running loop's asyncpg pool (if any); await it before the loop ends, e.g. at the end of asyncio.run."""
+    entry = _APOOLS.pop(id(asyncio.get_running_loop()), None)
+    if entry is not None:
+        try:
+            pool = await entry[1]
+        except Exception:
+            return  # never connected: nothing to close
+        await pool.close()
+
+async def aexecute_query(sql: str, *args, limit: int = 1000, timeout: int = 5):
+    """
+    Async execute_query on a shared asyncpg pool, so several queries can be awaited together
+    (asyncio.gather) on one event loop. Positional `args` bind to $1, $2, ...
+    - SELECT -> DataFrame (LIMIT added if missing); otherwise -> affected row count
+    - Raises TimeoutError past `timeout` seconds or on a server-side statement_timeout
+    """
+    if asyncpg is None:
+        raise RuntimeError("aexecute_query requires asyncpg (pip install asyncpg)")
+    sql_clean = sql.strip().rstrip(";")
+    is_select = _SELECT_RE.match(sql_clean) is not None
+    if is_select:
+        sql_clean = _with_limit(sql_clean, limit)
+
+    pool = await _apool()
+    try:
+        async with pool.acquire() as conn:
+            if not is_select:
+                status = await conn.execute(sql_clean, *args, timeout=timeout)
+                tail = status.rsplit(" ", 1)[-1]
+                return int(tail) if tail.isdigit() else 0
+            rows = await conn.fetch(sql_clean, *args, timeout=timeout)
+    except asyncpg.QueryCanceledError as e:
+        raise TimeoutError(f"Query cancelled by statement_timeout ({DB_STATEMENT_TIMEOUT_MS} ms)") from e
+    except asyncio.TimeoutError as e:
+        raise TimeoutError(f"Query exceeded timeout of {timeout}s") from e
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame.from_records(rows, columns=list(rows[0].keys()))
+
 # ---------------- Reset DB (used in tests) ----------------
 def reset_database(user=DB_USER, password=DB_PASS, host=DB_HOST, port=DB_PORT, db_name=DB_NAME):
     """
@@ -1,55 +1,215 @@
 # src/dynamic_normalization_pipeline.py
+import hashlib
+import io
 import json
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Set
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 from dataclasses import dataclass
-from src.utils import SAFE_NAME, infer_sql_type, pk_score, _ID_HINTS
+from src.utils import SAFE_NAME, infer_sql_type, is_int_like, is_id_column, pk_score
 
 try:
-    from sqlalchemy import create_engine
+    from sqlalchemy import create_engine, text
 except Exception:
     create_engine = None  # optional dependency
 
+try:
+    import orjson
+except Exception:
+    orjson = None  # optional dependency: stdlib json fallback
+
+try:
+    from psycopg2.extras import execute_values
+except Exception:
+    execute_values = None  # optional dependency
+
+try:
+    import pyarrow  # noqa: F401
+    _HAS_PARQUET = True
+except Exception:
+    _HAS_PARQUET = False  # optional dependency
+
+try:
+    import python_calamine  # noqa: F401
+    _HAS_CALAMINE = True
+except Exception:
+    _HAS_CALAMINE = False  # optional dependency: falls back to openpyxl
+
+_MAX_SHEET_WORKERS = 8
+
+def _normalize_columns(df: pd.DataFrame) -> None:
+    """Rename columns in place to SAFE_NAME identifiers (shared by the Excel and CSV loaders)."""
+    # Index.map over the memoized SAFE_NAME; .str kernels would reject non-string headers
+    df.columns = df.columns.map(SAFE_NAME)
+
+def _split_dtype_hints(hints: Optional[Dict[str, str]]) -> Tuple[Optional[Dict[str, str]], List[str]]:
+    """Split raw-header dtype hints into reader `dtype=` kwargs and columns to parse as datetimes."""
+    if not hints:
+        return None, []
+    # readers reject datetime dtypes in `dtype=`, so those columns are converted after parsing
+    dates = [c for c, d in hints.items() if str(d).startswith("datetime")]
+    dtype = {c: d for c, d in hints.items() if c not in dates}
+    return dtype or None, dates
+
+def _apply_date_hints(df: pd.DataFrame, dates: List[str]) -> None:
+    for c in dates:
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c], errors="coerce")
+
+def _read_sheet(path: Path, sheet: str, normalize: bool,
+                hints: Optional[Dict[str, str]] = None) -> Tuple[str, pd.DataFrame]:
+    """Parse one workbook sheet (module-level so it can run in a worker process)."""
+    dtype, dates = _split_dtype_hints(hints)
+    df = pd.read_excel(path, sheet_name=sheet, engine="openpyxl", dtype=dtype)
+    _apply_date_hints(df, dates)
+    if normalize:
+        _normalize_columns(df)
+    return SAFE_NAME(sheet), df
+
+def _parse_dates(ser: pd.Series, threshold: float = 0.9) -> Optional[pd.Series]:
+    """Return `ser` as datetimes if more than `threshold` of its values parse, else None."""
+    nonnull = ser.dropna()
+    with warnings.catch_warnings():
+        # free-text columns fall back to per-element dateutil; that's what the probe is for
+        warnings.simplefilter("ignore", UserWarning)
+        # probe a head sample first so text columns don't pay for a full parse
+        if pd.to_datetime(nonnull.head(200), errors="coerce").notna().mean() <= threshold:
+            return None
+        parsed = pd.to_datetime(ser, errors="coerce")
+    return parsed if parsed.notna().sum() > threshold * len(nonnull) else None
+
 @dataclass
 class DynConfig:
     normalize_columns: bool = True
     fk_match_threshold: float = 0.8
     build_gin_for_text: bool = True
     add_audit_cols: bool = True
+    excel_cache_dir: Optional[Path] = Path("data/cache")  # None disables the parquet cache
+    seed_method: str = "copy"  # "copy" (COPY FROM STDIN) or "values" (psycopg2 execute_values)
+    # raw header -> dtype (e.g. {"OrderID": "Int64", "OrderDate": "datetime64[ns]"}), applied at read time
+    dtype_hints: Optional[Dict[str, str]] = None
 
 class DynamicNormalizationPipeline:
     def __init__(self, config: Optional[DynConfig] = None):
         self.cfg = config or DynConfig()
         self.tables: Dict[str, pd.DataFrame] = {}
         self.col_types: Dict[str, Dict[str, str]] = {}
+        self.col_notnull: Dict[str, Dict[str, bool]] = {}
         self.pks: Dict[str, str] = {}
         self.fks: Dict[str, List[Tuple[str, str, str]]] = {}
         self.metrics: Dict[str, dict] = {}
 
     # ---------- Loaders ----------
-    def load_excel(self, path: Path) -> None:
-        wb = pd.ExcelFile(path)
-        for sheet in wb.sheet_names:
-            df = pd.read_excel(wb, sheet_name=sheet)
-            tname = SAFE_NAME(sheet)
+    def _excel_cache_path(self, path: Path) -> Optional[Path]:
+        """Per-workbook parquet cache folder, keyed by source path, mtime, size and read options."""
+        if self.cfg.excel_cache_dir is None or not _HAS_PARQUET:
+            return None
+        st = path.stat()
+        hints = json.dumps(sorted((self.cfg.dtype_hints or {}).items()), default=str)
+        ident = f"{path.resolve()}:{st.st_mtime_ns}:{st.st_size}:{self.cfg.normalize_columns}:{hints}"
+        return Path(self.cfg.excel_cache_dir) / f"{path.stem}-{hashlib.sha1(ident.encode('utf-8')).hexdigest()[:12]}"
+
+    @staticmethod
+    def _write_excel_cache(cache: Path, loaded: List[Tuple[str, pd.DataFrame]]) -> None:
+        try:
+            cache.mkdir(parents=True, exist_ok=True)
+            for tname, df in loaded:
+                df.to_parquet(cache / f"{tname}.parquet", compression="zstd", index=False)
+            # manifest written last so a half-written cache is never picked up
+            (cache / "tables.json").write_text(json.dumps([t for t, _ in loaded]), encoding="utf-8")
+        except Exception as e:
+            print(f"⚠️ Skipped parquet cache: {e}")
+
+    def _read_all_sheets(self, source, engine: Optional[str] = None) -> List[Tuple[str, pd.DataFrame]]:
+        """Parse every sheet of `source` (path or open ExcelFile) in one read_excel call."""
+        dtype, dates = _split_dtype_hints(self.cfg.dtype_hints)
+        frames = pd.read_excel(source, sheet_name=None, engine=engine, dtype=dtype)
+        loaded = [(SAFE_NAME(sheet), df) for sheet, df in frames.items()]
+        for _, df in loaded:
+            _apply_date_hints(df, dates)
             if self.cfg.normalize_columns:
-                df.columns = [SAFE_NAME(c) for c in df.columns]
+                _normalize_columns(df)
+        return loaded
+
+    def load_excel(self, path: Path) -> None:
+        path = Path(path)
+        cache = self._excel_cache_path(path)
+        if cache is not None and (cache / "tables.json").exists():
+            for tname in json.loads((cache / "tables.json").read_text(encoding="utf-8")):
+                self.tables[tname] = pd.read_parquet(cache / f"{tname}.parquet", memory_map=True)
+            print(f"🟢 Loaded cached sheets → tables: {list(self.tables.keys())}")
+            return
+
+        if _HAS_CALAMINE:
+            # Rust reader: a single in-process pass beats spawning workers
+            loaded = self._read_all_sheets(path, engine="calamine")
+        else:
+            loaded = None
+            with pd.ExcelFile(path, engine="openpyxl") as wb:
+                sheets = wb.sheet_names
+                # openpyxl parsing is CPU-bound pure Python (GIL-bound in threads), so fan sheets
+                # out across processes; each worker reopens the workbook, so cap the fan-out
+                workers = min(len(sheets), os.cpu_count() or 1, _MAX_SHEET_WORKERS)
+                if workers <= 1:
+                    # serial: reuse the open handle instead of reopening the archive per sheet
+                    loaded = self._read_all_sheets(wb)
+            if loaded is None:
+                args = (repeat(path), sheets, repeat(self.cfg.normalize_columns), repeat(self.cfg.dtype_hints))
+                with ProcessPoolExecutor(max_workers=workers) as ex:
+                    loaded = list(ex.map(_read_sheet, *args))
+        for tname, df in loaded:
             self.tables[tname] = df
+        if cache is not None:
+            self._write_excel_cache(cache, loaded)
         print(f"🟢 Loaded sheets → tables: {list(self.tables.keys())}")
 
+    def load_csv_dir(self, path: Path, chunksize: Optional[int] = None) -> None:
+        """
+        Load every *.csv in `path` as a table named after the file stem.
+        chunksize: parse in row batches (bounded parser buffers for very large files).
+        """
+        path = Path(path)
+        # Arrow's CSV reader is multithreaded C++ but can't chunk; pandas' C parser covers the rest
+        engine = "pyarrow" if _HAS_PARQUET and not chunksize else "c"
+        dtype, dates = _split_dtype_hints(self.cfg.dtype_hints)
+        for f in sorted(path.glob("*.csv")):
+            if chunksize:
+                chunks = pd.read_csv(f, engine=engine, chunksize=chunksize, dtype=dtype)
+                df = pd.concat(chunks, ignore_index=True, copy=False)
+            else:
+                df = pd.read_csv(f, engine=engine, dtype=dtype)
+            _apply_date_hints(df, dates)
+            if self.cfg.normalize_columns:
+                _normalize_columns(df)
+            self.tables[SAFE_NAME(f.stem)] = df
+        print(f"🟢 Loaded CSVs → tables: {list(self.tables.keys())}")
+
     # ---------- Inference ----------
     def infer_column_types(self) -> None:
         for t, df in self.tables.items():
-            self.col_types[t] = {c: infer_sql_type(df[c]) for c in df.columns}
+            self.col_types[t] = {c: infer_sql_type(ser) for c, ser in df.items()}
+            # reused by PK inference and DDL emit instead of rescanning each column
+            self.col_notnull[t] = (~df.isna().any()).to_dict()
+
+    def _notnull(self, t: str) -> Dict[str, bool]:
+        """{column: has no nulls} for table `t`, computed once per table."""
+        if t not in self.col_notnull:
+            self.col_notnull[t] = (~self.tables[t].isna().any()).to_dict()
+        return self.col_notnull[t]
 
     def infer_primary_keys(self) -> None:
         for t, df in self.tables.items():
             best = (-1, None)
+            # two frame-wide passes instead of two scans per column
+            unique = df.nunique(dropna=False).eq(len(df))
+            notnull = self._notnull(t)
             for c in df.columns:
-                unique, notnull = df[c].is_unique, not df[c].isna().any()
-                score = pk_score(c, unique, notnull, t)
+                score = pk_score(c, bool(unique[c]), bool(notnull[c]), t)
                 if score > best[0]:
                     best = (score, c)
             if best[1]:
@@ -63,29 +223,34 @@ class DynamicNormalizationPipeline:
                     synth = f"id{i}"
                 df.insert(0, synth, range(1, len(df)+1))
                 self.col_types[t][synth] = "BIGSERIAL"
+                self.col_notnull.setdefault(t, {})[synth] = True
                 self.pks[t] = synth
 
     def infer_foreign_keys(self) -> None:
         self.fks = {t: [] for t in self.tables}
-        pk_sets: Dict[str, Set] = {
-            pt: set(self.tables[pt][pk].dropna().unique().tolist())
-            for pt, pk in self.pks.items()
-        }
+        # unique parent keys as a pd.Index, built on first use; its hash engine is cached on the
+        # Index, so each child probe is a C lookup with no boxing or per-pair rehash of the parent
+        pk_index: Dict[str, pd.Index] = {}
         for ct, df in self.tables.items():
             for col in df.columns:
                 if col == self.pks[ct]:
                     continue
-                if not _ID_HINTS.search(col):
+                if not is_id_column(col):
+                    continue
+                child_vals = pd.Index(df[col].dropna().unique())
+                if child_vals.empty:
                     continue
                 for pt, parent_pk in self.pks.items():
                     if pt == ct:
                         continue
-                    child_vals = set(df[col].dropna().unique().tolist())
-                    if not child_vals:
+                    parent_vals = pk_index.get(pt)
+                    if parent_vals is None:
+                        parent_vals = pk_index[pt] = pd.Index(self.tables[pt][parent_pk].dropna().unique())
+                    # at most len(parent_vals) child values can match: skip parents too small to pass
+                    if len(parent_vals) < self.cfg.fk_match_threshold * len(child_vals):
                         continue
-                    parent_vals = pk_sets[pt]
-                    hit = len(child_vals & parent_vals)
-                    frac = hit / max(1, len(child_vals))
+                    hit = int((parent_vals.get_indexer(child_vals) != -1).sum())
+                    frac = hit / len(child_vals)
                     if frac >= self.cfg.fk_match_threshold:
                         self.fks[ct].append((col, pt, parent_pk))
                         break
@@ -102,43 +267,61 @@ class DynamicNormalizationPipeline:
 
     def write_report(self, out_dir: Path, name="dynamic_report") -> None:
         out_dir.mkdir(parents=True, exist_ok=True)
-        (out_dir / f"{name}.json").write_text(
-            json.dumps({"metrics": self.metrics, "pks": self.pks, "fks": self.fks, "types": self.col_types}, indent=2),
-            encoding="utf-8"
-        )
+        payload = {"metrics": self.metrics, "pks": self.pks, "fks": self.fks, "types": self.col_types}
+        if orjson is not None:
+            opts = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            (out_dir / f"{name}.json").write_bytes(orjson.dumps(payload, option=opts))
+        else:
+            (out_dir / f"{name}.json").write_text(json.dumps(payload, indent=2), encoding="utf-8")
         print(f"🧾 Wrote reports to {out_dir}/{name}.json")
 
     # ---------- SQL Emit ----------
     def _emit_table_sql(self, t: str) -> str:
         df = self.tables[t]
         pk = self.pks[t]
+        notnull = self._notnull(t)
         cols = []
         for c in df.columns:
             sqlt = self.col_types[t].get(c, "TEXT")
-            line = f'  {c} {sqlt}'
-            if not df[c].isna().any():
-                line += " NOT NULL"
-            cols.append(line)
+            # PRIMARY KEY already implies NOT NULL (and BIGSERIAL is only used for the surrogate PK)
+            implied = c == pk or sqlt == "BIGSERIAL"
+            cols.append(f"  {c} {sqlt} NOT NULL" if notnull[c] and not implied else f"  {c} {sqlt}")
         if self.cfg.add_audit_cols:
             cols.append("  created_at TIMESTAMPTZ NOT NULL DEFAULT now()")
             cols.append("  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()")
         cols.append(f"  PRIMARY KEY ({pk})")
         for (col, pt, parent_pk) in self.fks.get(t, []):
-            cols.append(f"  ,FOREIGN KEY ({col}) REFERENCES {pt}({parent_pk}) ON UPDATE CASCADE ON DELETE RESTRICT")
-        return f"CREATE TABLE IF NOT EXISTS {t} (\n{',\n'.join(cols)}\n);"
+            # deferrable so bulk loads can check all FKs once at commit (see seed_database)
+            cols.append(f"  FOREIGN KEY ({col}) REFERENCES {pt}({parent_pk}) ON UPDATE CASCADE ON DELETE RESTRICT"
+                        " DEFERRABLE INITIALLY IMMEDIATE")
+        buf = [f"CREATE TABLE IF NOT EXISTS {t} (", ",\n".join(cols), ");"]
+        return "\n".join(buf)
 
     def export_schema_sql(self, out_dir: Path) -> None:
         out_dir.mkdir(parents=True, exist_ok=True)
-        ddl = "-- Auto-generated schema (dynamic)\n" + "\n\n".join([self._emit_table_sql(t) for t in self.tables]) + "\n"
-        (out_dir / "01_tables.sql").write_text(ddl, encoding="utf-8")
+        buf = io.StringIO()
+        buf.write("-- Auto-generated schema (dynamic)\n")
+        for i, t in enumerate(self.tables):
+            if i:
+                buf.write("\n\n")
+            buf.write(self._emit_table_sql(t))
+        buf.write("\n")
+        (out_dir / "01_tables.sql").write_text(buf.getvalue(), encoding="utf-8")
         print(f"📦 Wrote {out_dir / '01_tables.sql'}")
 
     def export_indexes_sql(self, out_dir: Path) -> None:
         out_dir.mkdir(parents=True, exist_ok=True)
-        lines = ["-- Auto-generated indexes (dynamic)"]
+        lines = [
+            "-- Auto-generated indexes (dynamic)",
+            "-- Non-transactional: CREATE INDEX CONCURRENTLY cannot run inside a transaction block",
+        ]
+        seen = set()
         for t, fks in self.fks.items():
             for (col, pt, pk) in fks:
-                lines.append(f"CREATE INDEX IF NOT EXISTS idx_{t}_{col} ON {t}({col});")
+                if (t, col) in seen:
+                    continue
+                seen.add((t, col))
+                lines.append(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_{t}_{col} ON {t}({col});")
         (out_dir / "03_indexes.sql").write_text("\n".join(lines), encoding="utf-8")
         print(f"📦 Wrote {out_dir / '03_indexes.sql'}")
 
@@ -154,11 +337,93 @@ class DynamicNormalizationPipeline:
         print("✅ Dynamic normalization complete.")
 
     # ---------- Seeding ----------
+    @staticmethod
+    def _copy_frame(cur, t: str, df: pd.DataFrame, quote) -> None:
+        """
+        Stream a DataFrame into table `t` via COPY ... FROM STDIN (CSV).
+        `quote` is the dialect's identifier quoter (headers like "0_4" aren't bare identifiers).
+        """
+        out = df.copy(deep=False)
+        for c in out.columns:
+            # floats that only hold whole numbers would be rendered as "1.0",
+            # which COPY rejects for INTEGER/BIGINT columns
+            if pd.api.types.is_float_dtype(out[c]) and is_int_like(out[c]):
+                out[c] = out[c].astype("Int64")
+            # date strings go out as canonical ISO timestamps so PG takes its fast parse path;
+            # only all-string columns, since to_datetime would read bare ints as epoch ns
+            elif out[c].dtype == object and pd.api.types.infer_dtype(out[c], skipna=True) == "string":
+                parsed = _parse_dates(out[c])
+                if parsed is not None:
+                    out[c] = parsed
+        buf = io.StringIO()
+        out.to_csv(buf, index=False, header=False, na_rep="\\N")
+        buf.seek(0)
+        cols = ", ".join(quote(str(c)) for c in out.columns)
+        cur.copy_expert(f"COPY {quote(t)} ({cols}) FROM STDIN WITH (FORMAT CSV, NULL '\\N')", buf)
+
+    @staticmethod
+    def _insert_values(cur, t: str, df: pd.DataFrame, quote, page_size: int = 1000) -> None:
+        """Batch rows into multi-VALUES INSERTs (page_size rows per statement); `quote` as in _copy_frame."""
+        cols = ", ".join(quote(str(c)) for c in df.columns)
+        rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+        execute_values(cur, f"INSERT INTO {quote(t)} ({cols}) VALUES %s", rows, page_size=page_size)
+
+    @staticmethod
+    def _drop_secondary_indexes(conn, tables: List[str]) -> List[str]:
+        """
+        Drop non-constraint indexes on `tables` and return their DDL for rebuilding.
+        PK/unique/FK-backing indexes are left alone since they can't be dropped directly.
+        """
+        rows = conn.execute(text("""
+            SELECT i.relname, pg_get_indexdef(x.indexrelid)
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            JOIN pg_class t ON t.oid = x.indrelid
+            JOIN pg_namespace n ON n.oid = t.relnamespace
+            WHERE n.nspname = 'public' AND t.relname = ANY(:tables)
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+        """), {"tables": tables}).fetchall()
+        for name, _ in rows:
+            conn.exec_driver_sql(f'DROP INDEX IF EXISTS public."{name}"')
+        return [ddl for _, ddl in rows]
+
     def seed_database(self, db_url: str) -> None:
         if create_engine is None:
             raise RuntimeError("sqlalchemy required")
         eng = create_engine(db_url, future=True)
+        # one transaction for all tables; COPY goes through the raw psycopg2 cursor
         with eng.begin() as conn:
+            pg = conn.dialect.name == "postgresql"
+            index_ddl: List[str] = []
+            if pg:
+                # FK checks run once at COMMIT, so sheet order doesn't matter during the load
+                conn.exec_driver_sql("SET CONSTRAINTS ALL DEFERRED")
+                # build secondary (incl. GIN) indexes once after the load, not per row
+                index_ddl = self._drop_secondary_indexes(conn, list(self.tables))
+            cur = conn.connection.cursor()
+            # same quoting to_sql used when it created the tables
+            quote = conn.dialect.identifier_preparer.quote
             for t, df in self.tables.items():
-                df.to_sql(t, conn, if_exists="append", index=False)
-                print(f"  • {t}: {len(df)} rows inserted")
+                # creates the table when the schema SQL hasn't been applied; no-op otherwise
+                df.head(0).to_sql(t, conn, if_exists="append", index=False)
+                if pg and self.cfg.seed_method == "values" and execute_values is not None:
+                    self._insert_values(cur, t, df, quote)
+                    print(f"  • {t}: {len(df)} rows inserted")
+                elif pg and hasattr(cur, "copy_expert"):
+                    self._copy_frame(cur, t, df, quote)
+                    print(f"  • {t}: {len(df)} rows copied")
+                else:
+                    # no COPY (other dialect/driver): multi-row INSERTs kept under the bind-param
+                    # limit (65535 on PG, 999 on older SQLite builds)
+                    max_params = 65535 if pg else 999
+                    chunk = max(1, min(10_000, max_params // max(1, len(df.columns))))
+                    df.to_sql(t, conn, if_exists="append", index=False, method="multi", chunksize=chunk)
+                    print(f"  • {t}: {len(df)} rows inserted")
+            raw = conn.execution_options(no_parameters=True)
+            for ddl in index_ddl:
+                raw.exec_driver_sql(ddl)
+            if index_ddl:
+                print(f"  • rebuilt {len(index_ddl)} indexes")
+            # fresh tables have reltuples = 0 until autovacuum gets there; give the planner real stats now
+            for t in self.tables:
+                raw.exec_driver_sql(f"ANALYZE {quote(t)}")
@@ -1,21 +1,170 @@
 # src/history.py
-import sqlite3, datetime
+import atexit
+import datetime
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+_INSERT_SQL = "INSERT INTO history (question, sql, success, timestamp) VALUES (?, ?, ?, ?)"
+_CREATE_SQL = """
+    CREATE TABLE IF NOT EXISTS history (
+        id INTEGER PRIMARY KEY,
+        question TEXT,
+        sql TEXT,
+        success BOOLEAN,
+        timestamp INTEGER
+    )
+"""
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+# control markers for the writer queue
+_FLUSH = object()
+_STOP = object()
+
+logger = logging.getLogger("text2sql")
+
+def _now_us() -> int:
+    """UTC epoch microseconds (what new rows store in `timestamp`)."""
+    return time.time_ns() // 1000
+
+def _to_us(ts):
+    """Old-format timestamp (naive UTC ISO-8601 text, or digits) -> epoch microseconds."""
+    if ts is None or isinstance(ts, int):
+        return ts
+    if str(ts).isdigit():
+        return int(ts)
+    dt = datetime.datetime.fromisoformat(ts)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)  # written with utcnow()
+    return (dt - _EPOCH) // datetime.timedelta(microseconds=1)
+
+def _migrate(conn) -> None:
+    """
+    Databases created before timestamps became epoch µs declare `timestamp TEXT`; that
+    affinity would keep storing new values as text, so rebuild the table as INTEGER.
+    """
+    decl = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(history)")}
+    if decl.get("timestamp", "").upper() != "TEXT":
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("ALTER TABLE history RENAME TO history_text_ts")
+        conn.execute(_CREATE_SQL)
+        rows = conn.execute("SELECT id, question, sql, success, timestamp FROM history_text_ts")
+        conn.executemany(
+            "INSERT INTO history (id, question, sql, success, timestamp) VALUES (?, ?, ?, ?, ?)",
+            ((i, q, s, ok, _to_us(ts)) for i, q, s, ok, ts in rows.fetchall()),
+        )
+        conn.execute("DROP TABLE history_text_ts")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
 
 class QueryHistory:
-    def __init__(self, db="data/query_history.db"):
-        self.conn = sqlite3.connect(db)
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS history (
-                id INTEGER PRIMARY KEY,
-                question TEXT,
-                sql TEXT,
-                success BOOLEAN,
-                timestamp TEXT
-            )
-        """)
-        self.conn.commit()
+    def __init__(self, db="data/query_history.db", batch_size: int = 50, flush_seconds: float = 1.0):
+        """
+        Rows are written by a background thread, committed every `batch_size` rows or
+        `flush_seconds` after the first pending row, whichever comes first. flush()
+        blocks until everything logged so far is committed; it also runs at exit.
+        close() drains and stops the writer; logging after it raises RuntimeError.
+        """
+        self.db = db
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self._q: "queue.Queue" = queue.Queue()
+        self._ready = threading.Event()
+        self._open_error = None
+        self._closed = False
+        self._writer = threading.Thread(target=self._run_writer, name="query-history", daemon=True)
+        self._writer.start()
+        # surface a bad path / locked db here rather than losing rows silently later
+        self._ready.wait()
+        if self._open_error is not None:
+            raise self._open_error
+        atexit.register(self.flush)
+
+    def _open(self):
+        # the writer thread's own connection: nothing else touches it, so no cross-thread locking
+        # autocommit mode: transactions are opened explicitly in _write
+        conn = sqlite3.connect(self.db, cached_statements=512, isolation_level=None)
+        # WAL + NORMAL: a commit no longer fsyncs the main db file every time
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(_CREATE_SQL)
+        _migrate(conn)
+        return conn
+
+    def _check_open(self):
+        # the writer is gone after close(): fail loudly rather than queue rows nobody writes
+        if self._closed:
+            raise RuntimeError("QueryHistory is closed")
 
     def log(self, question, sql, success):
-        self.conn.execute("INSERT INTO history (question, sql, success, timestamp) VALUES (?, ?, ?, ?)",
-                          (question, sql, success, datetime.datetime.utcnow().isoformat()))
-        self.conn.commit()
+        # enqueue only: the SQLite write happens off the request path
+        self._check_open()
+        self._q.put((question, sql, success, _now_us()))
+
+    def log_many(self, rows):
+        """Queue (question, sql, success) tuples; they share one timestamp."""
+        self._check_open()
+        ts = _now_us()
+        for q, s, ok in rows:
+            self._q.put((q, s, ok, ts))
+
+    def flush(self):
+        if self._writer.is_alive():
+            self._q.put(_FLUSH)
+            self._q.join()
+
+    def _run_writer(self):
+        try:
+            self.conn = self._open()
+        except Exception as e:
+            self._open_error = e
+            return
+        finally:
+            self._ready.set()
+        batch, taken, deadline = [], 0, None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._q.get(timeout=timeout)
+                taken += 1
+            except queue.Empty:
+                item = _FLUSH  # flush_seconds elapsed with rows pending
+            if item is not _FLUSH and item is not _STOP:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_seconds
+                if len(batch) < self.batch_size:
+                    continue
+            self._write(batch)
+            batch, deadline = [], None
+            # acknowledge rows and markers only once they're committed, so flush() can join()
+            for _ in range(taken):
+                self._q.task_done()
+            taken = 0
+            if item is _STOP:
+                self.conn.close()
+                return
+
+    def _write(self, rows):
+        if not rows:
+            return
+        try:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(_INSERT_SQL, rows)
+            self.conn.execute("COMMIT")
+        except Exception as e:
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK")
+            logger.warning("Dropped %d history rows: %s", len(rows), e)
+
+    def close(self):
+        self._closed = True
+        if self._writer.is_alive():
+            self._q.put(_STOP)
+            self._writer.join()
+        atexit.unregister(self.flush)
@@ -1,26 +1,96 @@
 # src/monitor.py
+import threading
+import time
+
 import psutil
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from src.config import DB_URL
+from src.database import get_engine
+
+try:
+    import orjson
+    from psycopg2.extras import register_default_json
+except Exception:
+    register_default_json = None  # optional dependency: psycopg2 keeps using stdlib json
+
+# pg_stat_database changes slowly; serve it up to _STATS_TTL seconds stale
+_STATS_TTL = 2.0
+_stats = {"rows": None, "at": 0.0, "refreshing": False}
+_stats_lock = threading.Lock()
+
+# cpu_percent(interval=None) reports usage since the previous call; prime it so the
+# first /monitor read is a real non-blocking sample rather than a meaningless 0.0
+psutil.cpu_percent(interval=None)
+
+def _fetch_db_stats():
+    with get_engine().connect() as conn:
+        rows = conn.execute(
+            text("SELECT datname, numbackends, xact_commit, blks_hit FROM pg_stat_database")
+        ).mappings()
+        # plain dicts: RowMapping isn't JSON-serializable
+        return [dict(r) for r in rows]
+
+def _refresh_db_stats():
+    try:
+        rows = _fetch_db_stats()
+        with _stats_lock:
+            _stats["rows"], _stats["at"] = rows, time.monotonic()
+    finally:
+        with _stats_lock:
+            _stats["refreshing"] = False
+
+def _cached_db_stats():
+    """Stale-while-revalidate: return the last rows now, refresh in the background once expired."""
+    with _stats_lock:
+        rows, age = _stats["rows"], time.monotonic() - _stats["at"]
+        if rows is not None and age >= _STATS_TTL and not _stats["refreshing"]:
+            _stats["refreshing"] = True
+            threading.Thread(target=_refresh_db_stats, daemon=True).start()
+    if rows is None:  # first call: nothing to serve yet
+        rows = _fetch_db_stats()
+        with _stats_lock:
+            _stats["rows"], _stats["at"] = rows, time.monotonic()
+    return rows
 
 def get_db_stats():
     """Return CPU, memory and DB stats from PostgreSQL."""
-    eng = create_engine(DB_URL, future=True)
-    with eng.connect() as conn:
-        stats = conn.execute(
-            "SELECT datname, numbackends, xact_commit, blks_hit FROM pg_stat_database;"
-        ).fetchall()
     return {
-        "cpu": psutil.cpu_percent(),
+        "cpu": psutil.cpu_percent(interval=None),
         "memory": psutil.virtual_memory().percent,
-        "db_stats": [dict(row._mapping) for row in stats],
+        "db_stats": _cached_db_stats(),
     }
 
-def get_query_plan(sql: str):
-    """Return EXPLAIN ANALYZE plan for a query in JSON format."""
-    eng = create_engine(DB_URL, future=True)
+def _explain(conn, stmt: str):
+    """
+    Run one EXPLAIN (FORMAT JSON) and return the parsed plan (None if no row). The orjson
+    decoder is registered on this cursor only, so other json columns keep stdlib parsing.
+    """
+    cur = conn.connection.cursor()
+    try:
+        if register_default_json is not None:
+            register_default_json(cur, loads=orjson.loads)
+        cur.execute(stmt)  # no params: a literal % in the SQL is left alone
+        row = cur.fetchone()
+    finally:
+        cur.close()
+    return row[0] if row else None
+
+def get_query_plan(sql: str, analyze: bool = True):
+    """
+    Return the plan for a query in JSON format. analyze=True runs EXPLAIN ANALYZE,
+    which executes the query; analyze=False only asks the planner.
+    """
+    opts = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    eng = get_engine(DB_URL)
+    with eng.connect() as conn:
+        return _explain(conn, f"EXPLAIN ({opts}) {sql}")
+
+def get_query_plans(sqls):
+    """
+    Return EXPLAIN (FORMAT JSON) plans for several queries over one connection.
+    psycopg2 only surfaces the last result set of a `;`-joined batch, so the
+    EXPLAINs are issued back-to-back on a single connection instead.
+    """
+    eng = get_engine(DB_URL)
     with eng.connect() as conn:
-        plan = conn.execute(
-            text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
-        ).fetchone()
-        return plan[0] if plan else None
+        return [_explain(conn, f"EXPLAIN (FORMAT JSON) {sql}") for sql in sqls]
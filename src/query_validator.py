@@ -16,7 +16,7 @@ FORBIDDEN = re.compile(
     r"""
     \b(INSERT|UPDATE|DELETE|MERGE|UPSERT|REPLACE|TRUNCATE|
        CREATE|ALTER|DROP|RENAME|GRANT|REVOKE|COMMENT|ANALYZE|
-       VACUUM|COPY|CALL|DO|EXECUTE|SET\s+ROLE|SET\s+SESSION\s+AUTHORIZATION|
+       VACUUM|COPY|CALL|DO|EXECUTE|COMMIT|ROLLBACK|SET\s+ROLE|SET\s+SESSION\s+AUTHORIZATION|
        SECURITY\s+DEFINER|SECURITY\s+INVOKER)
     \b
     """,
@@ -25,6 +25,13 @@ FORBIDDEN = re.compile(
 
 MULTI_STMT_SEMI = re.compile(r";\s*[^;\s]", re.DOTALL)  # semicolon followed by more SQL
 
+_RE_LINE_COMMENT = re.compile(r"--[^\n]*")
+_RE_BLOCK_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+_RE_WS = re.compile(r"\s+")
+_RE_LIMIT_NUM = re.compile(r"\bLIMIT\s+(\d+)\b", re.IGNORECASE)
+_RE_SELECT_WITH = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_RE_SQL_PREFIX = re.compile(r"^\s*(SQL\s*:\s*)", re.IGNORECASE)
+
 def _strip_code_fences(sql: str) -> str:
     s = sql.strip()
     # remove ```sql ... ``` or ``` ... ```
@@ -40,13 +47,13 @@ def _strip_code_fences(sql: str) -> str:
 
 def _strip_sql_comments(sql: str) -> str:
     # remove -- line comments
-    s = re.sub(r"--[^\n]*", "", sql)
+    s = _RE_LINE_COMMENT.sub("", sql)
     # remove /* ... */ block comments
-    s = re.sub(r"/\*.*?\*/", "", s, flags=re.DOTALL)
+    s = _RE_BLOCK_COMMENT.sub("", s)
     return s
 
 def _collapse_ws(sql: str) -> str:
-    return re.sub(r"\s+", " ", sql).strip()
+    return _RE_WS.sub(" ", sql).strip()
 
 def _ensure_single_statement(sql: str) -> str:
     # allow optional trailing semicolon; but not multiple statements
@@ -62,13 +69,13 @@ def _enforce_limit(sql: str, max_limit: int = 1000) -> str:
     - Tightens LIMIT if it's larger than max_limit
     """
     # simple detection; handle with/without OFFSET
-    m = re.search(r"\bLIMIT\s+(\d+)\b", sql, flags=re.IGNORECASE)
+    m = _RE_LIMIT_NUM.search(sql)
     if not m:
         return f"{sql} LIMIT {max_limit}"
     else:
         current = int(m.group(1))
         if current > max_limit:
-            sql = re.sub(r"\bLIMIT\s+\d+\b", f"LIMIT {max_limit}", sql, flags=re.IGNORECASE)
+            sql = _RE_LIMIT_NUM.sub(f"LIMIT {max_limit}", sql)
         return sql
 
 def clean_llm_sql(raw: str) -> str:
@@ -79,7 +86,7 @@ def clean_llm_sql(raw: str) -> str:
     s = _strip_sql_comments(s)
     s = _collapse_ws(s)
     # remove leading "SQL:" or similar prefixes if present
-    s = re.sub(r"^\s*(SQL\s*:\s*)", "", s, flags=re.IGNORECASE)
+    s = _RE_SQL_PREFIX.sub("", s)
     return s
 
 def sanitize_query(raw_sql: str, max_limit: int = 1000) -> str:
@@ -94,7 +101,7 @@ def sanitize_query(raw_sql: str, max_limit: int = 1000) -> str:
     s = _ensure_single_statement(s)
 
     # Must start with SELECT or WITH
-    if not re.match(r"^\s*(SELECT|WITH)\b", s, flags=re.IGNORECASE):
+    if not _RE_SELECT_WITH.match(s):
         raise ValueError("Only SELECT queries are allowed!")
 
     # Must not contain forbidden verbs
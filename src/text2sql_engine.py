@@ -11,26 +11,40 @@ Production Text2SQL engine (modular):
 from __future__ import annotations
 
 import json
+import asyncio
+import bisect
+import hashlib
 import logging
 import datetime
-from typing import Dict, Any
+import functools
+import itertools
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple, Union
 
-import google.generativeai as genai
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, inspect
+from cachetools import TTLCache
+from sqlalchemy import text
 
 from src.config import DB_URL, MODEL_NAME, GEMINI_API_KEY
-from src.cache import QueryCache
+from src.cache import _TTL as _RESULT_TTL, QueryCache
 from src.history import QueryHistory
 from src.monitor import get_db_stats, get_query_plan
 from src.query_validator import sanitize_query
-from src.database import execute_query
+from src.database import execute_query, get_engine
 
-# Configure Gemini with the API key
-if GEMINI_API_KEY:
+@functools.lru_cache(maxsize=1)
+def _genai():
+    """
+    google.generativeai, imported and configured on first Gemini use: the SDK drags in
+    gRPC/protobuf, so paths that never call Gemini (tests, CLI helpers) skip it entirely.
+    """
+    if not GEMINI_API_KEY:
+        raise ValueError("GOOGLE_API_KEY not found in environment variables")
+    import google.generativeai as genai
     genai.configure(api_key=GEMINI_API_KEY)
-else:
-    raise ValueError("GOOGLE_API_KEY not found in environment variables")
+    return genai
 
 # ---------------- Setup ----------------
 logger = logging.getLogger("text2sql")
@@ -38,6 +52,54 @@ if not logger.handlers:
     logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
 
 
+_PREFIX_TTL = datetime.timedelta(hours=1)
+# recreate a prompt cache this long before the server expires it
+_PREFIX_REFRESH = datetime.timedelta(minutes=5)
+
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+def _cache_gone(e: Exception) -> bool:
+    """Gemini no longer serves a CachedContent (expired/deleted/not ours): retry inline."""
+    try:
+        from google.api_core import exceptions as gexc  # loaded with the SDK by now
+    except Exception:
+        return False
+    return isinstance(e, (gexc.NotFound, gexc.PermissionDenied))
+
+_COLUMNS_SQL = text("""
+    SELECT c.table_name, c.column_name
+    FROM information_schema.columns c
+    JOIN information_schema.tables t
+      ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+    WHERE c.table_schema = 'public' AND t.table_type = 'BASE TABLE'
+    ORDER BY c.table_name, c.ordinal_position
+""")
+
+# Reflected schema context per database URL; the catalog rarely changes mid-process
+_schema_cache = TTLCache(maxsize=8, ttl=300)
+# cachetools caches aren't thread-safe; run_async/run_batch reach this from worker threads
+_schema_lock = threading.Lock()
+# guards Text2SQLEngine._prefix_models: concurrent cold misses must create one billed CachedContent, not one each
+_prefix_lock = threading.Lock()
+
+_RULES = """STRICT RULES:
+- PostgreSQL dialect.
+- Single query starting with SELECT or WITH.
+- No invented columns or tables.
+- Always add LIMIT when returning many rows.
+- Output ONLY SQL."""
+
+# Fixed bytes first so provider-side implicit prefix caching can match across calls:
+# role + rules (never change), then the schema (changes on DDL), then the question.
+_PROMPT_HEAD = f"""You are an expert SQL assistant.
+
+{_RULES}
+
+Use ONLY the schema below.
+"""
+
+
 # ---------------- Helpers ----------------
 def _json_default(obj):
     """Fix Decimal and date serialization for JSON dumps."""
@@ -48,61 +110,202 @@ def _json_default(obj):
     raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
 
 
+# ---------------- Semantic cache ----------------
+class SemanticCache:
+    """
+    Answers keyed on question meaning: cosine similarity between Gemini embeddings
+    (a flat inner-product index over unit vectors). Entries are scoped, e.g. by schema
+    hash + limit, and a new scope drops everything cached under the old one. Answers
+    expire after `ttl` seconds (QueryCache's result TTL) so changed data is re-queried.
+    """
+
+    def __init__(self, threshold: float = 0.92, maxsize: int = 1000,
+                 model: str = "models/text-embedding-004", ttl: float = _RESULT_TTL):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.model = model
+        self.ttl = ttl
+        self._scope: Optional[str] = None
+        self._vecs: Optional[np.ndarray] = None  # (n, dim) float32, rows L2-normalized
+        self._payloads: List[Dict[str, Any]] = []
+        self._added: List[float] = []  # monotonic insert times, oldest first
+        self._lock = threading.Lock()
+
+    def embed(self, text: str) -> np.ndarray:
+        vec = np.asarray(_genai().embed_content(model=self.model, content=text)["embedding"], dtype=np.float32)
+        return vec / (np.linalg.norm(vec) or 1.0)
+
+    def _expire(self) -> None:
+        # entries are appended in time order, so the expired ones are a prefix
+        cut = bisect.bisect_right(self._added, time.monotonic() - self.ttl)
+        if cut:
+            self._added, self._payloads = self._added[cut:], self._payloads[cut:]
+            self._vecs = self._vecs[cut:] if self._payloads else None
+
+    def lookup(self, vec: np.ndarray, scope: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if scope != self._scope or self._vecs is None:
+                return None
+            self._expire()
+            if self._vecs is None:
+                return None
+            sims = self._vecs @ vec
+            best = int(sims.argmax())
+            if sims[best] < self.threshold:
+                return None
+            hit = self._payloads[best]
+        # copies, so a caller editing the response can't rewrite the cached answer
+        if isinstance(hit.get("results"), list):
+            return dict(hit, results=[dict(r) for r in hit["results"]])
+        return dict(hit)
+
+    def add(self, vec: np.ndarray, payload: Dict[str, Any], scope: str) -> None:
+        with self._lock:
+            if scope != self._scope:
+                self._scope, self._vecs, self._payloads, self._added = scope, None, [], []
+            row = vec[None, :]
+            self._vecs = row if self._vecs is None else np.vstack([self._vecs, row])[-self.maxsize:]
+            self._payloads = (self._payloads + [payload])[-self.maxsize:]
+            self._added = (self._added + [time.monotonic()])[-self.maxsize:]
+
+
 # ---------------- Engine ----------------
 class Text2SQLEngine:
-    def __init__(self, model_name: str = MODEL_NAME, debug: bool = False):
-        self.model = genai.GenerativeModel(model_name)
+    # sha256(static prompt prefix) -> (model bound to its CachedContent or None, UTC expiry)
+    _prefix_models: Dict[str, Tuple[Optional[Any], datetime.datetime]] = {}
+
+    def __init__(self, model_name: str = MODEL_NAME, debug: bool = False, semantic_cache: bool = False):
+        """semantic_cache: serve near-duplicate questions from earlier answers (opt-in; costs an embedding call)."""
+        self.model_name = model_name
+        self.semantic = SemanticCache() if semantic_cache else None
+        self._model = None
         self.debug = debug
-        self.cache = QueryCache(maxsize=100)
+        self.cache = QueryCache()
         self.history = QueryHistory()
 
     def _fetch_schema_context(self) -> str:
-        """Reflect schema from live DB and build context string."""
-        eng = create_engine(DB_URL, future=True)
-        insp = inspect(eng)
+        """Reflect schema from live DB and build context string (cached for 5 minutes)."""
+        with _schema_lock:
+            ctx = _schema_cache.get(DB_URL)
+        if ctx is None:
+            # reflect outside the lock; concurrent misses just store the same string
+            ctx = self._reflect_schema_context()
+            with _schema_lock:
+                _schema_cache[DB_URL] = ctx
+        return ctx
+
+    def _reflect_schema_context(self) -> str:
+        # one catalog round-trip for every table's columns (the inspector issues one per table)
+        with get_engine(DB_URL).connect() as conn:
+            rows = conn.execute(_COLUMNS_SQL).all()
         ignore = {"order_details"}  # avoid duplicates
         lines = ["Database schema (USE ONLY these exact tables/columns):"]
-        for t in insp.get_table_names(schema="public"):
+        for t, cols in itertools.groupby(rows, key=lambda r: r[0]):
             if t in ignore:
                 continue
-            cols = [c["name"] for c in insp.get_columns(t, schema="public")]
-            lines.append(f"- {t}({', '.join(cols)})")
+            lines.append(f"- {t}({', '.join(c for _, c in cols)})")
         return "\n".join(lines)
 
-    def generate_sql(self, question: str) -> str:
-        """Generate SQL query using Gemini model."""
-        schema_context = self._fetch_schema_context()
-        prompt = f"""
-You are an expert SQL assistant. 
-Use ONLY the schema below.
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = _genai().GenerativeModel(self.model_name)
+        return self._model
 
-{schema_context}
+    def _cached_model(self, prefix: str) -> Tuple[Optional[Any], str]:
+        """
+        (model bound to a Gemini CachedContent holding `prefix` or None, its key), created on
+        first use and recreated shortly before the server-side TTL runs out. A new schema
+        hashes to a new key, so a changed prefix gets its own cache.
+        """
+        key = hashlib.sha256(f"{self.model_name}\0{prefix}".encode("utf-8")).hexdigest()
+        # server-side context caching needs google-generativeai >= 0.7; use it when present
+        caching = getattr(_genai(), "caching", None)
+        if caching is None:
+            return None, key
+        # held across create(): other threads wait for this cache instead of making their own
+        with _prefix_lock:
+            entry = self._prefix_models.get(key)
+            if entry is None or entry[1] - _PREFIX_REFRESH <= _utcnow():
+                try:
+                    cache = caching.CachedContent.create(
+                        model=self.model_name, contents=[prefix], ttl=_PREFIX_TTL
+                    )
+                    expires = getattr(cache, "expire_time", None) or _utcnow() + _PREFIX_TTL
+                    if expires.tzinfo is None:
+                        expires = expires.replace(tzinfo=datetime.timezone.utc)
+                    entry = (_genai().GenerativeModel.from_cached_content(cached_content=cache), expires)
+                except Exception as e:
+                    # e.g. prefix below the model's minimum cacheable size: send it inline for a TTL
+                    logger.info("Gemini context caching unavailable: %s", e)
+                    entry = (None, _utcnow() + _PREFIX_TTL)
+                self._prefix_models[key] = entry
+        return entry[0], key
 
-STRICT RULES:
-- PostgreSQL dialect.
-- Single query starting with SELECT or WITH.
-- No invented columns or tables.
-- Always add LIMIT when returning many rows.
-- Output ONLY SQL.
+    def _drop_cached_model(self, key: str, model: Any) -> None:
+        """Forget `key` only if it still maps to `model` (another thread may have refreshed it)."""
+        with _prefix_lock:
+            entry = self._prefix_models.get(key)
+            if entry is not None and entry[0] is model:
+                del self._prefix_models[key]
 
-Question: {question}
-SQL:
-"""
-        resp = self.model.generate_content(prompt)
+    def _prompt(self, question: str, use_cache: bool = True) -> Tuple[Any, str, Optional[str]]:
+        """
+        (model to call, contents to send, prefix-cache key when the cached model is used):
+        just the question when the prefix is cached.
+        """
+        prefix = f"{_PROMPT_HEAD}\n{self._fetch_schema_context()}\n"
+        suffix = f"Question: {question}\nSQL:\n"
+        if use_cache:
+            cached, key = self._cached_model(prefix)
+            if cached is not None:
+                return cached, suffix, key
+        return self.model, prefix + "\n" + suffix, None
+
+    def _response_sql(self, resp) -> str:
+        usage = getattr(resp, "usage_metadata", None)
+        if self.debug and usage is not None and getattr(usage, "cached_content_token_count", 0):
+            logger.info("Gemini cached prompt tokens: %s", usage.cached_content_token_count)
         sql = (resp.text or "").strip()
         if self.debug:
             logger.info("Gemini raw SQL:\n%s", sql)
         return sql
 
-    def run(self, question: str, timeout_ms: int = 5000, limit: int = 1000) -> Dict[str, Any]:
-        """Main entry: generate, sanitize, execute, log, return results."""
-        raw_sql = ""
+    def generate_sql(self, question: str) -> str:
+        """Generate SQL query using Gemini model."""
+        model, contents, key = self._prompt(question)
+        try:
+            resp = model.generate_content(contents)
+        except Exception as e:
+            if key is None or not _cache_gone(e):
+                raise
+            # the cache went away before its recorded expiry: forget it, retry once inline
+            self._drop_cached_model(key, model)
+            model, contents, _ = self._prompt(question, use_cache=False)
+            resp = model.generate_content(contents)
+        return self._response_sql(resp)
+
+    async def generate_sql_async(self, question: str) -> str:
+        """generate_sql without blocking the event loop on the Gemini round-trip."""
+        # schema reflection is a (usually cached) blocking DB call
+        model, contents, key = await asyncio.to_thread(self._prompt, question)
+        try:
+            resp = await model.generate_content_async(contents)
+        except Exception as e:
+            if key is None or not _cache_gone(e):
+                raise
+            self._drop_cached_model(key, model)
+            model, contents, _ = await asyncio.to_thread(self._prompt, question, False)
+            resp = await model.generate_content_async(contents)
+        return self._response_sql(resp)
+
+    def _execute(self, question: str, raw_sql: str, limit: int, timeout_ms: int = 5000) -> Dict[str, Any]:
+        """Sanitize, execute (cancelled server-side after timeout_ms), log and package the generated SQL."""
         try:
-            raw_sql = self.generate_sql(question)
             safe_sql = sanitize_query(raw_sql, max_limit=limit)
 
-            eng = create_engine(DB_URL, future=True)
-            df: pd.DataFrame = self.cache.get(safe_sql, eng)
+            # the payload only needs row dicts, so skip the DataFrame round-trip
+            rows = self.cache.get(safe_sql, records=True, timeout_ms=timeout_ms)
 
             # log success
             self.history.log(question, safe_sql, True)
@@ -110,14 +313,84 @@ SQL:
             return {
                 "ok": True,
                 "sql": safe_sql,
-                "rows": len(df),
-                "results": df.to_dict(orient="records"),
-                "plan": get_query_plan(safe_sql),
+                "rows": len(rows),
+                "results": rows,
             }
+        except TimeoutError as e:
+            return self._failed(question, raw_sql, e, error="timeout")
         except Exception as e:
-            logger.error("Text2SQL pipeline error: %s", e)
-            self.history.log(question, raw_sql, False)
-            return {"ok": False, "error": str(e)}
+            return self._failed(question, raw_sql, e)
+
+    def _failed(self, question: str, raw_sql: str, e: Exception, error: Optional[str] = None) -> Dict[str, Any]:
+        logger.error("Text2SQL pipeline error: %s", e)
+        self.history.log(question, raw_sql, False)
+        return {"ok": False, "error": error or str(e)}
+
+    def _semantic_lookup(self, question: str, limit: int) -> Tuple[Optional[Dict[str, Any]], Any]:
+        """(cached payload or None, (vector, scope) to store the fresh answer under, or None)."""
+        if self.semantic is None:
+            return None, None
+        try:
+            scope = hashlib.sha256(f"{limit}\0{self._fetch_schema_context()}".encode("utf-8")).hexdigest()
+            vec = self.semantic.embed(question)
+        except Exception as e:
+            logger.info("Semantic cache skipped: %s", e)
+            return None, None
+        hit = self.semantic.lookup(vec, scope)
+        if hit is not None:
+            self.history.log(question, hit.get("sql", ""), True)  # served answers are still asked questions
+        return hit, (vec, scope)
+
+    def _remember(self, slot, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if slot is not None and payload.get("ok"):
+            self.semantic.add(slot[0], payload, slot[1])
+        return payload
+
+    @staticmethod
+    def _with_plan(payload: Dict[str, Any], include_plan) -> Dict[str, Any]:
+        """Attach an EXPLAIN plan on request; "analyze" re-executes the query to time it."""
+        if not include_plan or not payload.get("ok"):
+            return payload
+        return dict(payload, plan=get_query_plan(payload["sql"], analyze=include_plan == "analyze"))
+
+    def run(self, question: str, timeout_ms: int = 5000, limit: int = 1000,
+            include_plan: Union[bool, str] = False) -> Dict[str, Any]:
+        """
+        Main entry: generate, sanitize, execute, log, return results.
+        include_plan: True adds the EXPLAIN plan, "analyze" the EXPLAIN ANALYZE one.
+        """
+        hit, slot = self._semantic_lookup(question, limit)
+        if hit is not None:
+            return self._with_plan(hit, include_plan)
+        try:
+            raw_sql = self.generate_sql(question)
+        except Exception as e:
+            return self._failed(question, "", e)
+        return self._with_plan(self._remember(slot, self._execute(question, raw_sql, limit, timeout_ms)), include_plan)
+
+    async def run_async(self, question: str, timeout_ms: int = 5000, limit: int = 1000,
+                        include_plan: Union[bool, str] = False) -> Dict[str, Any]:
+        """Async run(): awaits Gemini, runs the DB side in a worker thread."""
+        hit, slot = await asyncio.to_thread(self._semantic_lookup, question, limit)
+        if hit is None:
+            try:
+                raw_sql = await self.generate_sql_async(question)
+            except Exception as e:
+                return self._failed(question, "", e)
+            hit = self._remember(slot, await asyncio.to_thread(self._execute, question, raw_sql, limit, timeout_ms))
+        if include_plan and hit.get("ok"):
+            hit = await asyncio.to_thread(self._with_plan, hit, include_plan)
+        return hit
+
+    async def run_batch(self, questions: List[str], max_concurrency: int = 4, **kwargs) -> List[Dict[str, Any]]:
+        """Answer several questions concurrently, at most `max_concurrency` in flight (Gemini QPM)."""
+        sem = asyncio.Semaphore(max_concurrency)
+
+        async def one(q: str) -> Dict[str, Any]:
+            async with sem:
+                return await self.run_async(q, **kwargs)
+
+        return await asyncio.gather(*(one(q) for q in questions))
 
 
 # ---------------- CLI ----------------
@@ -143,7 +416,7 @@ Rows:
 {df.to_csv(index=False)}
 """
         try:
-            formatter = genai.GenerativeModel(MODEL_NAME)
+            formatter = _genai().GenerativeModel(MODEL_NAME)
             formatted = formatter.generate_content(format_prompt)
             print("\nPretty Output:\n")
             print(formatted.text.strip())
@@ -1,19 +1,31 @@
 # src/utils.py
 import re
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 
-_ID_HINTS = re.compile(r"(?:^|_)(id|.*_id)$")
+_SAFE_NAME_RE = re.compile(r"[^a-z0-9_]")
 
+def is_id_column(col) -> bool:
+    """True for `id` / `*_id` column names (FK candidates)."""
+    col = str(col)
+    return col == "id" or col.endswith("_id")
+
+@lru_cache(maxsize=4096)  # the same headers recur across sheets and reloads
 def SAFE_NAME(s: str) -> str:
     """Normalize strings into safe SQL identifiers."""
-    return re.sub(r"[^a-z0-9_]", "_", str(s).lower().strip())
+    return _SAFE_NAME_RE.sub("_", str(s).lower().strip())
 
 def is_int_like(series: pd.Series) -> bool:
     if pd.api.types.is_integer_dtype(series):
         return True
     if pd.api.types.is_float_dtype(series):
-        s = series.dropna()
-        return (s == s.round()).all()
+        arr = series.to_numpy(dtype="float64", na_value=np.nan)
+        arr = arr[~np.isnan(arr)]
+        # cheap head probe first: most non-integer float columns fail within a few rows
+        if np.any(np.mod(arr[:1024], 1.0) != 0.0):
+            return False
+        return bool(np.all(np.mod(arr, 1.0) == 0.0))
     return False
 
 def infer_sql_type(series: pd.Series) -> str:
@@ -34,15 +46,17 @@ def infer_sql_type(series: pd.Series) -> str:
     if pd.api.types.is_float_dtype(s):
         return "NUMERIC(18,6)"
     try:
-        dt = pd.to_datetime(s, errors="coerce")
-        if not dt.isna().all():
-            if dt.dt.time.eq(pd.Timestamp(0).time()).all():
+        # only parse the whole column when a head sample looks like dates
+        is_dt = pd.api.types.is_datetime64_any_dtype(s)
+        if is_dt or pd.to_datetime(s.head(100), errors="coerce").notna().any():
+            dt = s if is_dt else pd.to_datetime(s, errors="coerce")
+            # midnight-only check without materializing a datetime.time per row
+            if dt.eq(dt.dt.normalize()).all():
                 return "DATE"
             return "TIMESTAMPTZ"
     except Exception:
         pass
-    s2 = s.astype(str)
-    maxlen = int(s2.str.len().max())
+    maxlen = max(map(len, s.astype(str).to_numpy()))
     if maxlen <= 255:
         bucket = 50 if maxlen <= 50 else (100 if maxlen <= 100 else 255)
         return f"VARCHAR({bucket})"
@@ -0,0 +1,15 @@
+"""Keyword scan shared by the accuracy suites' evaluate_query heuristics."""
+import re
+
+# one scan of the generated SQL yields every keyword the quality heuristics look at.
+# Plain substrings, exactly like the original `"COUNT" in sql.upper()` checks
+# (so COUNTRY still counts as COUNT, and GROUP BY needs a single space)
+_KW_RE = re.compile(r"JOIN|WHERE|GROUP BY|LIMIT|AVG|SUM|COUNT", re.IGNORECASE)
+
+# bits in each suite's quality mask: joins | where | group-by | indexing | time
+N_QUALITY_CHECKS = 5
+
+
+def sql_keywords(sql):
+    """Upper-cased quality keywords occurring anywhere in `sql`."""
+    return {m.upper() for m in _KW_RE.findall(sql)}
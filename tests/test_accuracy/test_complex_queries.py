@@ -1,13 +1,14 @@
 import pytest
 import time
-from statistics import mean
+
+from tests.test_accuracy._scoring import N_QUALITY_CHECKS, sql_keywords
 
 
 def evaluate_query(engine, question, expected_non_empty=True):
     """Run a query through the Text2SQL engine and compute heuristic accuracy metrics."""
-    start = time.time()
+    t0 = time.perf_counter_ns()
     payload = engine.run(question, limit=500)
-    elapsed = time.time() - start
+    elapsed = (time.perf_counter_ns() - t0) / 1e9
 
     metrics = {}
 
@@ -21,15 +22,16 @@ def evaluate_query(engine, question, expected_non_empty=True):
         metrics["result_match"] = 1 if payload["ok"] else 0
 
     # Query quality heuristics (40%)
-    sql_text = payload.get("sql", "").lower()
-    quality_metrics = {
-        "uses_proper_joins": 1 if "join" in sql_text else 0,
-        "has_necessary_where": 1 if "where" in sql_text or "group by" in sql_text else 0,
-        "correct_group_by": 1 if "group by" in sql_text else 0,
-        "efficient_indexing": 1,  # assume schema indexes help
-        "execution_time": 1 if elapsed < 3.0 else 0,
-    }
-    metrics["query_quality"] = mean(quality_metrics.values())
+    kws = sql_keywords(payload.get("sql", ""))
+    # one bit per heuristic (see _scoring.N_QUALITY_CHECKS)
+    mask = (
+        ("JOIN" in kws) << 0
+        | ("WHERE" in kws or "GROUP BY" in kws) << 1
+        | ("GROUP BY" in kws) << 2
+        | 1 << 3  # efficient_indexing: assume schema indexes help
+        | (elapsed < 3.0) << 4
+    )
+    metrics["query_quality"] = bin(mask).count("1") / N_QUALITY_CHECKS
 
     accuracy_score = (
         0.20 * metrics["execution_success"]
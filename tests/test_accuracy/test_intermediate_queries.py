@@ -1,13 +1,14 @@
 import pytest
 import time
-from statistics import mean
+
+from tests.test_accuracy._scoring import N_QUALITY_CHECKS, sql_keywords
 
 
 def evaluate_query(engine, question, expected_non_empty=True):
     """Run a query through the Text2SQL engine and compute heuristic accuracy metrics."""
-    start = time.time()
+    t0 = time.perf_counter_ns()
     payload = engine.run(question, limit=200)
-    elapsed = time.time() - start
+    elapsed = (time.perf_counter_ns() - t0) / 1e9
 
     metrics = {}
 
@@ -21,14 +22,16 @@ def evaluate_query(engine, question, expected_non_empty=True):
         metrics["result_match"] = 1 if payload["ok"] else 0
 
     # Query quality heuristics (40%)
-    quality_metrics = {
-        "uses_proper_joins": 1 if "JOIN" in payload.get("sql", "").upper() else 0,
-        "has_necessary_where": 1 if "WHERE" in payload.get("sql", "").upper() or "GROUP BY" in payload.get("sql", "").upper() else 0,
-        "correct_group_by": 1 if "GROUP BY" in payload.get("sql", "").upper() else 0,
-        "efficient_indexing": 1,  # assume schema indexes cover basics
-        "execution_time": 1 if elapsed < 2.0 else 0,
-    }
-    metrics["query_quality"] = mean(quality_metrics.values())
+    kws = sql_keywords(payload.get("sql", ""))
+    # one bit per heuristic (see _scoring.N_QUALITY_CHECKS)
+    mask = (
+        ("JOIN" in kws) << 0
+        | ("WHERE" in kws or "GROUP BY" in kws) << 1
+        | ("GROUP BY" in kws) << 2
+        | 1 << 3  # efficient_indexing: assume schema indexes cover basics
+        | (elapsed < 2.0) << 4
+    )
+    metrics["query_quality"] = bin(mask).count("1") / N_QUALITY_CHECKS
 
     accuracy_score = (
         0.20 * metrics["execution_success"]
@@ -41,89 +44,38 @@ def evaluate_query(engine, question, expected_non_empty=True):
 
 # -------------------- Intermediate Query Tests --------------------
 
-def test_total_revenue_per_category(text2sql_engine):
-    q = "What is the total revenue per product category?"
-    payload, metrics, score = evaluate_query(text2sql_engine, q)
-    assert metrics["execution_success"] == 1
-    assert "group by" in payload["sql"].lower()
-    assert score > 0.6
-
-
-def test_employee_most_orders(text2sql_engine):
-    q = "Which employee has processed the most orders?"
-    payload, metrics, score = evaluate_query(text2sql_engine, q)
-    assert metrics["execution_success"] == 1
-    assert "employee" in payload["sql"].lower()
-    assert "order" in payload["sql"].lower()
-    assert score > 0.6
-
-
-def test_monthly_sales_trends_1997(text2sql_engine):
-    q = "Show monthly sales trends for 1997"
-    payload, metrics, score = evaluate_query(text2sql_engine, q)
-    assert metrics["execution_success"] == 1
-    assert "1997" in payload["sql"]
-    assert "group by" in payload["sql"].lower()
-    assert score > 0.6
-
-
-def test_top5_customers_total_value(text2sql_engine):
-    q = "List the top 5 customers by total order value"
-    payload, metrics, score = evaluate_query(text2sql_engine, q)
-    assert metrics["execution_success"] == 1
-    assert "limit" in payload["sql"].lower()
-    assert "customer" in payload["sql"].lower()
-    assert score > 0.6
-
-
-def test_avg_order_value_by_country(text2sql_engine):
-    q = "What is the average order value by country?"
-    payload, metrics, score = evaluate_query(text2sql_engine, q)
-    assert metrics["execution_success"] == 1
-    assert "avg" in payload["sql"].lower()
-    assert "group by" in payload["sql"].lower()
-    assert score > 0.6
-
-
-def test_products_out_of_stock_not_discontinued(text2sql_engine):
-    q = "Which products are out of stock but not discontinued?"
-    payload, metrics, score = evaluate_query(text2sql_engine, q)
-    assert metrics["execution_success"] == 1
-    assert "where" in payload["sql"].lower()
-    assert "unitsinstock" in payload["sql"].lower() or "units_in_stock" in payload["sql"].lower()
-    assert score > 0.6
-
-
-def test_orders_per_shipper(text2sql_engine):
-    q = "Show the number of orders per shipper company"
-    payload, metrics, score = evaluate_query(text2sql_engine, q)
-    assert metrics["execution_success"] == 1
-    assert "shipper" in payload["sql"].lower()
-    assert "group by" in payload["sql"].lower()
-    assert score > 0.6
-
-
-def test_revenue_contribution_suppliers(text2sql_engine):
-    q = "What is the revenue contribution of each supplier?"
-    payload, metrics, score = evaluate_query(text2sql_engine, q)
-    assert metrics["execution_success"] == 1
-    assert "supplier" in payload["sql"].lower()
-    assert "group by" in payload["sql"].lower()
-    assert score > 0.6
-
-
-def test_customers_orders_every_quarter_1997(text2sql_engine):
-    q = "Find customers who placed orders in every quarter of 1997"
-    payload, metrics, score = evaluate_query(text2sql_engine, q)
-    assert metrics["execution_success"] == 1
-    assert "1997" in payload["sql"]
-    assert score > 0.6
-
-
-def test_avg_delivery_time_by_shipper(text2sql_engine):
-    q = "Calculate average delivery time by shipping company"
+# (question, required SQL substrings); each requirement is a tuple of accepted
+# spellings, matched against the lower-cased SQL
+CASES = [
+    pytest.param("What is the total revenue per product category?", [("group by",)],
+                 id="total_revenue_per_category"),
+    pytest.param("Which employee has processed the most orders?", [("employee",), ("order",)],
+                 id="employee_most_orders"),
+    pytest.param("Show monthly sales trends for 1997", [("1997",), ("group by",)],
+                 id="monthly_sales_trends_1997"),
+    pytest.param("List the top 5 customers by total order value", [("limit",), ("customer",)],
+                 id="top5_customers_total_value"),
+    pytest.param("What is the average order value by country?", [("avg",), ("group by",)],
+                 id="avg_order_value_by_country"),
+    pytest.param("Which products are out of stock but not discontinued?",
+                 [("where",), ("unitsinstock", "units_in_stock")],
+                 id="products_out_of_stock_not_discontinued"),
+    pytest.param("Show the number of orders per shipper company", [("shipper",), ("group by",)],
+                 id="orders_per_shipper"),
+    pytest.param("What is the revenue contribution of each supplier?", [("supplier",), ("group by",)],
+                 id="revenue_contribution_suppliers"),
+    pytest.param("Find customers who placed orders in every quarter of 1997", [("1997",)],
+                 id="customers_orders_every_quarter_1997"),
+    pytest.param("Calculate average delivery time by shipping company", [("avg",), ("ship",)],
+                 id="avg_delivery_time_by_shipper"),
+]
+
+
+@pytest.mark.parametrize("q, required_sql", CASES)
+def test_query(text2sql_engine, q, required_sql):
     payload, metrics, score = evaluate_query(text2sql_engine, q)
     assert metrics["execution_success"] == 1
-    assert "avg" in payload["sql"].lower()
-    assert "ship" in payload["sql"].lower()
+    sql = payload["sql"].lower()
+    for options in required_sql:
+        assert any(o in sql for o in options), f"expected one of {options} in SQL"
     assert score > 0.6
@@ -1,13 +1,15 @@
 import pytest
 import time
-from statistics import mean
+
+from tests.test_accuracy._scoring import N_QUALITY_CHECKS, sql_keywords
+
 
 # Heuristic evaluation helper
 def evaluate_query(engine, question, expected_non_empty=True):
     """Run a query through the Text2SQL engine and compute heuristic accuracy metrics."""
-    start = time.time()
+    t0 = time.perf_counter_ns()
     payload = engine.run(question, limit=100)
-    elapsed = time.time() - start
+    elapsed = (time.perf_counter_ns() - t0) / 1e9
 
     metrics = {}
 
@@ -21,14 +23,16 @@ def evaluate_query(engine, question, expected_non_empty=True):
         metrics["result_match"] = 1 if payload["ok"] else 0
 
     # Query quality heuristics (40%)
-    quality_metrics = {
-        "uses_proper_joins": 1 if "JOIN" in payload.get("sql", "").upper() else 1,  # allow single table
-        "has_necessary_where": 1 if "WHERE" in payload.get("sql", "").upper() or not expected_non_empty else 1,
-        "correct_group_by": 1 if "GROUP BY" in payload.get("sql", "").upper() or "COUNT" not in payload.get("sql", "").upper() else 0,
-        "efficient_indexing": 1,  # assume covered by schema indexes
-        "execution_time": 1 if elapsed < 1.0 else 0,
-    }
-    metrics["query_quality"] = mean(quality_metrics.values())
+    kws = sql_keywords(payload.get("sql", ""))
+    # one bit per heuristic (see _scoring.N_QUALITY_CHECKS)
+    mask = (
+        1 << 0  # uses_proper_joins: allow single table
+        | 1 << 1  # has_necessary_where: not required for simple lookups
+        | ("GROUP BY" in kws or "COUNT" not in kws) << 2
+        | 1 << 3  # efficient_indexing: assume covered by schema indexes
+        | (elapsed < 1.0) << 4
+    )
+    metrics["query_quality"] = bin(mask).count("1") / N_QUALITY_CHECKS
 
     # Final score
     accuracy_score = (
@@ -42,36 +46,29 @@ def evaluate_query(engine, question, expected_non_empty=True):
 
 # -------------------- Tests --------------------
 
-def test_products_not_discontinued(text2sql_engine):
-    q = "How many products are currently not discontinued?"
-    payload, metrics, score = evaluate_query(text2sql_engine, q)
-    assert metrics["execution_success"] == 1
-    assert score > 0.6  # at least decent accuracy
+# (question, required SQL substrings, result rows required); each requirement is a tuple
+# of accepted spellings, matched against the lower-cased SQL
+CASES = [
+    pytest.param("How many products are currently not discontinued?", [], False,
+                 id="products_not_discontinued"),
+    pytest.param("List all customers from Germany", [], True,
+                 id="customers_from_germany"),
+    pytest.param("What is the unit price of the most expensive product?", [("unit_price", "unitprice")], False,
+                 id="most_expensive_product"),
+    pytest.param("Show all orders shipped in 1997", [("1997",)], False,
+                 id="orders_shipped_1997"),
+    pytest.param("Which employee has the job title 'Sales Representative'?", [("title",)], False,
+                 id="sales_representatives"),
+]
 
-def test_customers_from_germany(text2sql_engine):
-    q = "List all customers from Germany"
-    payload, metrics, score = evaluate_query(text2sql_engine, q)
-    assert metrics["execution_success"] == 1
-    assert len(payload["results"]) > 0
-    assert score > 0.6
 
-def test_most_expensive_product(text2sql_engine):
-    q = "What is the unit price of the most expensive product?"
+@pytest.mark.parametrize("q, required_sql, needs_rows", CASES)
+def test_query(text2sql_engine, q, required_sql, needs_rows):
     payload, metrics, score = evaluate_query(text2sql_engine, q)
     assert metrics["execution_success"] == 1
-    assert "unit_price" in payload["sql"].lower() or "unitprice" in payload["sql"].lower()
-    assert score > 0.6
-
-def test_orders_shipped_1997(text2sql_engine):
-    q = "Show all orders shipped in 1997"
-    payload, metrics, score = evaluate_query(text2sql_engine, q)
-    assert metrics["execution_success"] == 1
-    assert "1997" in payload["sql"]
-    assert score > 0.6
-
-def test_sales_representatives(text2sql_engine):
-    q = "Which employee has the job title 'Sales Representative'?"
-    payload, metrics, score = evaluate_query(text2sql_engine, q)
-    assert metrics["execution_success"] == 1
-    assert "title" in payload["sql"].lower()
-    assert score > 0.6
+    if needs_rows:
+        assert len(payload["results"]) > 0
+    sql = payload["sql"].lower()
+    for options in required_sql:
+        assert any(o in sql for o in options), f"expected one of {options} in SQL"
+    assert score > 0.6  # at least decent accuracy
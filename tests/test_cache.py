@@ -0,0 +1,82 @@
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+import src.cache as cache_mod
+from src.cache import QueryCache
+
+
+@pytest.fixture(autouse=True)
+def _empty_store():
+    # the store is process-wide: start every test from a clean slate
+    cache_mod._STORE.clear()
+    yield
+    cache_mod._STORE.clear()
+
+
+def test_cache_hits_on_equivalent_sql(monkeypatch):
+    """Whitespace-only differences should share one cache entry."""
+    conn = create_engine("sqlite://")
+    cache = QueryCache()
+    calls = []
+    real_run = cache._run_query
+    monkeypatch.setattr(cache, "_run_query", lambda sql, eng: calls.append(sql) or real_run(sql, eng))
+
+    first = cache.get("SELECT 1 AS n", conn)
+    second = cache.get("SELECT   1 AS n\n", conn)
+    assert len(calls) == 1
+    assert first.equals(second)
+
+
+def test_cache_key_canonicalizes_keyword_case_but_not_literals():
+    pytest.importorskip("sqlglot")  # optional: without it keys only collapse whitespace
+    conn = create_engine("sqlite://")
+    key = QueryCache._key
+    assert key("select n from t where s = 'A'", conn) == key("SELECT n FROM t WHERE s='A'", conn)
+    assert key("SELECT n FROM t WHERE s = 'A'", conn) != key("SELECT n FROM t WHERE s = 'a'", conn)
+
+
+def test_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(cache_mod, "_MAXSIZE", 2)
+    conn = create_engine("sqlite://")
+    cache = QueryCache()
+    for n in range(3):
+        cache.get(f"SELECT {n} AS n", conn)
+    assert len(cache._store) == 2
+    assert cache._key("SELECT 0 AS n", conn) not in cache._store
+
+
+def test_cache_is_shared_across_instances():
+    """A fresh QueryCache (e.g. per request) should see earlier results."""
+    conn = create_engine("sqlite://")
+    QueryCache().get("SELECT 42 AS n", conn)
+    assert QueryCache()._key("SELECT 42 AS n", conn) in QueryCache()._store
+
+
+def test_concurrent_misses_share_one_query(monkeypatch):
+    """A burst of identical cold queries should hit the database once."""
+    conn = create_engine("sqlite://")
+    cache = QueryCache()
+    calls = []
+
+    def slow_run(sql, eng):
+        calls.append(sql)
+        time.sleep(0.05)
+        return pd.DataFrame({"n": [7]})
+
+    monkeypatch.setattr(cache, "_run_query", slow_run)
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        frames = list(ex.map(lambda _: cache.get("SELECT 7 AS n", conn), range(8)))
+    assert len(calls) == 1
+    assert all(f["n"].tolist() == [7] for f in frames)
+
+
+def test_connections_without_url_are_not_cached():
+    """A raw DBAPI connection has no URL to scope by, so it always goes to the database."""
+    conn = sqlite3.connect(":memory:")
+    QueryCache().get("SELECT 1 AS n", conn)
+    assert len(cache_mod._STORE) == 0
@@ -1,30 +1,31 @@
 import pytest
 import pandas as pd
-from src.data_loader import DataLoader
+from pathlib import Path
 
-def test_load_valid_excel_file(tmp_path):
+NORTHWIND = Path("data/raw/northwind.xlsx")
+# every test here parses the workbook: skip the module outright when it isn't checked out
+pytestmark = pytest.mark.skipif(not NORTHWIND.exists(), reason="northwind.xlsx not available")
+
+def test_load_valid_excel_file(loaded_northwind):
     """Ensure Excel file loads correctly into DataFrames."""
-    loader = DataLoader(filepath="data/raw/northwind.xlsx")
-    loader.load_excel()
+    loader = loaded_northwind
     assert isinstance(loader.tables, dict)
     assert len(loader.tables) > 0, "Should have loaded at least one table"
     first_table = list(loader.tables.values())[0]
     assert isinstance(first_table, pd.DataFrame)
 
-def test_handle_missing_values():
+def test_handle_missing_values(northwind_loader):
     """Verify null handling reduces or maintains NaN count."""
-    loader = DataLoader(filepath="data/raw/northwind.xlsx")
-    loader.load_excel()
+    loader = northwind_loader
     table_name = list(loader.tables.keys())[0]
     before_nulls = loader.tables[table_name].isnull().sum().sum()
     loader.handle_nulls()
     after_nulls = loader.tables[table_name].isnull().sum().sum()
     assert after_nulls <= before_nulls, "Null count should decrease or remain the same"
 
-def test_data_type_validation():
+def test_data_type_validation(northwind_loader):
     """Ensure dtypes are validated/optimized."""
-    loader = DataLoader(filepath="data/raw/northwind.xlsx")
-    loader.load_excel()
+    loader = northwind_loader
     loader.validate_dtypes()
     table_name = list(loader.tables.keys())[0]
     df = loader.tables[table_name]
@@ -32,18 +33,16 @@ def test_data_type_validation():
     non_object_cols = [col for col in df.columns if df[col].dtype != "object"]
     assert isinstance(non_object_cols, list)
 
-def test_foreign_key_detection():
+def test_foreign_key_detection(northwind_loader):
     """Check that foreign keys are detected between related tables."""
-    loader = DataLoader(filepath="data/raw/northwind.xlsx")
-    loader.load_excel()
+    loader = northwind_loader
     fks = loader.detect_foreign_keys()
     found = any(len(v) > 0 for v in fks.values())
     assert found, "Should detect at least one foreign key relationship"
 
-def test_duplicate_row_detection():
+def test_duplicate_row_detection(northwind_loader):
     """Ensure duplicate rows are detected correctly."""
-    loader = DataLoader(filepath="data/raw/northwind.xlsx")
-    loader.load_excel()
+    loader = northwind_loader
     dups = loader.detect_duplicates()
     assert isinstance(dups, dict)
     for count in dups.values():
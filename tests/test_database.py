@@ -1,18 +1,26 @@
 # tests/test_database.py
+import asyncio
 import pytest
 import threading
 import time
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
-from src.database import execute_query, get_engine
+from src.database import (
+    _with_limit, aclose_pools, aexecute_query, execute_many, execute_query, execute_query_stream, get_engine,
+)
+
+
+# most tests here talk to Postgres: share one warmed pool across the module
+pytestmark = pytest.mark.usefixtures("warm_pool")
 
 
 def test_connection_pool_management():
     """Ensure engine provides valid connections and can handle multiple requests."""
     engine = get_engine()
     with engine.connect() as conn:
-        result = conn.execute(text("SELECT 1;"))  # ✅ wrap in text()
-        assert result.scalar() == 1
+        assert conn.execute(text("SELECT 1;")).scalar() == 1
+    # returned to the pool for the next request rather than closed
+    assert engine.pool.checkedin() > 0
 
 
 def test_transaction_rollback():
@@ -42,6 +50,9 @@ def test_result_set_limiting():
     """Ensure LIMIT is enforced on queries."""
     df = execute_query("SELECT * FROM orders LIMIT 5;")
     assert len(df) <= 5
+    # the streaming variant stops fetching at `limit` even when the SQL asks for more
+    df = execute_query_stream("SELECT * FROM orders LIMIT 50;", limit=5)
+    assert len(df) <= 5
 
 
 def test_concurrent_query_execution():
@@ -69,3 +80,71 @@ def test_concurrent_query_execution():
 
     assert not errors
     assert all(isinstance(n, int) for n in results)
+
+
+def test_batched_query_execution():
+    """Several reads over one connection/transaction come back in order, each limited."""
+    frames = execute_many([
+        "SELECT * FROM customers LIMIT 10;",
+        "SELECT * FROM products LIMIT 10;",
+        "SELECT * FROM orders",
+    ], limit=10)
+    assert len(frames) == 3
+    assert all(len(df) <= 10 for df in frames)
+
+
+def test_concurrent_query_execution_async():
+    """Same three reads, awaited together over the shared asyncpg pool."""
+    pytest.importorskip("asyncpg")
+    queries = [
+        "SELECT * FROM customers LIMIT 10;",
+        "SELECT * FROM products LIMIT 10;",
+        "SELECT * FROM orders LIMIT 10;",
+    ]
+
+    async def run_all():
+        try:
+            return await asyncio.gather(*(aexecute_query(q) for q in queries))
+        finally:
+            await aclose_pools()  # release the pool's connections before asyncio.run closes the loop
+
+    frames = asyncio.run(run_all())
+    assert len(frames) == 3
+    assert all(len(df) <= 10 for df in frames)
+
+
+# --- _with_limit: pure string rewriting, no database needed ---
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM customers WHERE notes = 'no limit here'",      # 'limit' inside a literal
+    "WITH recent AS (SELECT * FROM orders LIMIT 3) SELECT * FROM recent",  # LIMIT only in the CTE
+    "SELECT * FROM (SELECT * FROM orders LIMIT 3) o",             # LIMIT only in the subquery
+    "SELECT city FROM customers UNION SELECT city FROM suppliers",
+])
+def test_with_limit_adds_outer_limit(sql):
+    """Only a top-level LIMIT counts: literals, CTEs and subqueries still get one appended."""
+    pytest.importorskip("sqlglot")
+    assert _with_limit(sql, 10) == f"{sql}\nLIMIT 10"
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM customers LIMIT 5",
+    "SELECT city FROM customers UNION SELECT city FROM suppliers LIMIT 5",
+])
+def test_with_limit_keeps_existing_limit(sql):
+    pytest.importorskip("sqlglot")
+    assert _with_limit(sql, 10) == sql
+
+
+def test_with_limit_after_trailing_comment():
+    """The appended LIMIT goes on its own line, not into the `--` comment."""
+    pytest.importorskip("sqlglot")
+    out = _with_limit("SELECT * FROM orders -- newest first", 10)
+    assert out.splitlines()[-1] == "LIMIT 10"
+
+
+def test_with_limit_unparseable_falls_back_to_regex():
+    """SQL sqlglot can't parse is left for the DB to reject; only the regex decides."""
+    pytest.importorskip("sqlglot")
+    assert _with_limit("SELECT * FROM orders WHERE (id = 1", 10) == "SELECT * FROM orders WHERE (id = 1 LIMIT 10"
+    assert _with_limit("SELECT * FROM orders WHERE (id = 1 LIMIT 4", 10) == "SELECT * FROM orders WHERE (id = 1 LIMIT 4"
@@ -3,17 +3,13 @@ from pathlib import Path
 from src.data_loader import DataLoader
 from src.dynamic_normalization_pipeline import DynamicNormalizationPipeline, DynConfig
 
+NORTHWIND = Path("data/raw/northwind.xlsx")
+requires_northwind = pytest.mark.skipif(not NORTHWIND.exists(), reason="northwind.xlsx not available")
+
 # ------------------------
 # Basic loading tests
 # ------------------------
 
-def test_load_excel_file(tmp_path):
-    """Ensure Excel can be loaded via pipeline."""
-    loader = DataLoader(filepath="data/raw/northwind.xlsx")
-    loader.load_excel()
-    assert isinstance(loader.tables, dict)
-    assert len(loader.tables) > 0
-
 def test_load_csv_directory(tmp_path):
     """Ensure CSV dir loads without errors (if exists)."""
     csv_dir = Path("data/raw/csvs")
@@ -26,18 +22,18 @@ def test_load_csv_directory(tmp_path):
 # Pipeline run & outputs
 # ------------------------
 
-def test_run_all_creates_outputs(tmp_path):
-    loader = DataLoader(filepath="data/raw/northwind.xlsx")
-    loader.load_excel()
+@requires_northwind
+def test_run_all_creates_outputs(tmp_path, northwind_loader):
+    loader = northwind_loader
     out_dir = tmp_path / "outputs"
     loader.run_all(out_dir)
     assert out_dir.exists()
     # Expect some report or SQL-like output files
     assert any(out_dir.iterdir())
 
-def test_export_schema_and_indexes(tmp_path):
-    loader = DataLoader(filepath="data/raw/northwind.xlsx")
-    loader.load_excel()
+@requires_northwind
+def test_export_schema_and_indexes(tmp_path, northwind_loader):
+    loader = northwind_loader
     sql_dir = tmp_path / "schema"
     loader.export_schema_sql(sql_dir)
     loader.export_indexes_sql(sql_dir)
@@ -48,25 +44,72 @@ def test_export_schema_and_indexes(tmp_path):
 # Seeding DB (optional)
 # ------------------------
 
-def test_seed_database(monkeypatch):
+def _require_seedable_pg():
+    """DB_URL, or skip unless it is a reachable PostgreSQL where we may create tables in public."""
+    from sqlalchemy import text
     from src.config import DB_URL
-    loader = DataLoader(filepath="data/raw/northwind.xlsx")
-    loader.load_excel()
+    from src.database import get_engine
+    # one cheap probe instead of failing midway through a full seed
     try:
-        loader.seed_database(DB_URL)
+        with get_engine(DB_URL).connect() as conn:
+            can_create = conn.execute(
+                text("SELECT has_schema_privilege(current_user, 'public', 'CREATE')")
+            ).scalar()
     except Exception:
-        pytest.skip("Seed DB requires superuser rights; skip in CI")
+        pytest.skip("Seed DB needs a reachable PostgreSQL; skip in CI")
+    if not can_create:
+        pytest.skip("Seed DB requires CREATE rights on schema public; skip in CI")
+    return DB_URL
+
+@requires_northwind
+def test_seed_database(monkeypatch):
+    db_url = _require_seedable_pg()
+    loader = DataLoader(filepath=NORTHWIND)
+    loader.load_excel()
+    # past the probe, any seed error is a real failure
+    loader.seed_database(db_url)
+
+def test_seed_database_values_method():
+    """seed_method="values" (execute_values) handles headers that need quoting."""
+    import pandas as pd
+    from sqlalchemy import create_engine, text
+    db_url = _require_seedable_pg()
+    pytest.importorskip("psycopg2.extras")
+    pipe = DynamicNormalizationPipeline(DynConfig(seed_method="values"))
+    table = "seed_values_check"
+    pipe.tables[table] = pd.DataFrame({"order_id": range(50), "0_4": [1.5] * 50})
+    eng = create_engine(db_url, future=True)
+    try:
+        pipe.seed_database(db_url)
+        with eng.connect() as conn:
+            n, total = conn.execute(text(f'SELECT COUNT(*), SUM("0_4") FROM {table}')).one()
+        assert n == 50 and total == 75
+    finally:
+        with eng.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+
+def test_seed_database_without_copy(tmp_path):
+    """Non-Postgres targets fall back to batched INSERTs."""
+    import pandas as pd
+    from sqlalchemy import create_engine, text
+    pipe = DynamicNormalizationPipeline(DynConfig())
+    pipe.tables["orders"] = pd.DataFrame({"order_id": range(500), "amount": [1.5] * 500})
+    db_url = f"sqlite:///{tmp_path / 'seed.db'}"
+    pipe.seed_database(db_url)
+    with create_engine(db_url).connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM orders")).scalar() == 500
 
 # ------------------------
 # CLI entrypoint
 # ------------------------
 
+@requires_northwind
 def test_cli_excel(monkeypatch, tmp_path):
     """Simulate CLI call with --excel and --out."""
     import sys
     import src.data_loader as data_loader
 
-    test_excel = "data/raw/northwind.xlsx"
+    test_excel = str(NORTHWIND)
     out_dir = tmp_path / "cli_out"
 
     monkeypatch.setattr(sys, "argv", [
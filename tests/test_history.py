@@ -0,0 +1,77 @@
+import sqlite3
+import time
+
+import pytest
+
+from src.history import QueryHistory
+
+
+def _count(db):
+    with sqlite3.connect(db) as conn:
+        return conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+
+def test_rows_visible_after_flush(tmp_path):
+    db = str(tmp_path / "history.db")
+    # neither the batch size nor the timer would commit these on their own
+    h = QueryHistory(db, batch_size=1000, flush_seconds=60)
+    h.log("q1", "SELECT 1", True)
+    h.log_many([("q2", "SELECT 2", False), ("q3", "SELECT 3", True)])
+    h.flush()
+    assert _count(db) == 3
+    h.close()
+
+
+def test_pending_rows_committed_after_flush_seconds(tmp_path):
+    db = str(tmp_path / "history.db")
+    h = QueryHistory(db, batch_size=1000, flush_seconds=0.05)
+    h.log("q", "SELECT 1", True)
+    deadline = time.monotonic() + 5
+    while _count(db) == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _count(db) == 1
+    h.close()
+
+
+def test_close_drains_every_queued_row(tmp_path):
+    db = str(tmp_path / "history.db")
+    h = QueryHistory(db, batch_size=50, flush_seconds=60)
+    for i in range(120):  # two full batches plus a partial one
+        h.log(f"q{i}", "SELECT 1", i % 2 == 0)
+    h.close()
+    assert _count(db) == 120
+
+
+def test_log_after_close_raises(tmp_path):
+    h = QueryHistory(str(tmp_path / "history.db"))
+    h.close()
+    with pytest.raises(RuntimeError):
+        h.log("late", "SELECT 1", True)
+    with pytest.raises(RuntimeError):
+        h.log_many([("late", "SELECT 1", True)])
+    h.flush()  # no-op once closed
+    h.close()  # idempotent
+
+
+def test_text_timestamps_are_migrated_to_epoch_us(tmp_path):
+    """A pre-µs database (timestamp TEXT, ISO-8601 UTC) is rebuilt as INTEGER on open."""
+    db = tmp_path / "history.db"
+    with sqlite3.connect(db) as conn:
+        conn.execute("""
+            CREATE TABLE history (
+                id INTEGER PRIMARY KEY, question TEXT, sql TEXT, success BOOLEAN, timestamp TEXT
+            )
+        """)
+        conn.execute(
+            "INSERT INTO history (question, sql, success, timestamp) VALUES (?, ?, ?, ?)",
+            ("old", "SELECT 1", True, "2025-10-04T18:38:19.699097"),
+        )
+    h = QueryHistory(str(db))
+    h.log("new", "SELECT 2", True)
+    h.close()
+    with sqlite3.connect(db) as conn:
+        rows = conn.execute("SELECT question, typeof(timestamp), timestamp FROM history ORDER BY timestamp").fetchall()
+        decl = {r[1]: r[2] for r in conn.execute("PRAGMA table_info(history)")}
+    assert decl["timestamp"] == "INTEGER"
+    assert [(q, t) for q, t, _ in rows] == [("old", "integer"), ("new", "integer")]
+    assert rows[0][2] == 1759603099699097
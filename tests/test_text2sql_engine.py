@@ -1,10 +1,3 @@
-import pytest
-from src.text2sql_engine import Text2SQLEngine
-
-@pytest.fixture(scope="module")
-def text2sql_engine():
-    return Text2SQLEngine(debug=True)
-
 def test_end_to_end_simple_query(text2sql_engine):
     question = "List all customers from Germany"
     payload = text2sql_engine.run(question, limit=10)
@@ -30,18 +23,66 @@ def test_aggregate_query_generation(text2sql_engine):
     assert "sum" in sql_lower or "count" in sql_lower or "avg" in sql_lower
     assert isinstance(payload["results"], list)
 
-def test_error_recovery_mechanism(text2sql_engine):
+def test_error_recovery_mechanism(mocked_engine):
     # Give a vague question to trigger retry/error handling
     question = "Tell me about stuff"
-    payload = text2sql_engine.run(question, limit=5)
+    payload = mocked_engine.run(question, limit=5)
     # Should fail gracefully instead of crashing
     assert "ok" in payload
     if not payload["ok"]:
         assert "error" in payload
 
-def test_invalid_question_handling(text2sql_engine):
+def test_invalid_question_handling(mocked_engine):
     # Nonsense / invalid input
     question = "DROP DATABASE northwind;"
-    payload = text2sql_engine.run(question, limit=5)
+    payload = mocked_engine.run(question, limit=5)
     assert not payload["ok"]
     assert "error" in payload
+
+def test_semantic_cache_matches_similar_vectors_in_scope():
+    import numpy as np
+    from src.text2sql_engine import SemanticCache
+
+    cache = SemanticCache(threshold=0.92)
+    unit = lambda *v: np.asarray(v, dtype=np.float32) / np.linalg.norm(v)
+    cache.add(unit(1, 0), {"ok": True, "sql": "SELECT 1"}, scope="schema-a")
+    assert cache.lookup(unit(1, 0.05), "schema-a")["sql"] == "SELECT 1"
+    assert cache.lookup(unit(0, 1), "schema-a") is None
+    # a changed schema hash never serves old answers
+    assert cache.lookup(unit(1, 0), "schema-b") is None
+
+def test_semantic_cache_expires_and_returns_copies():
+    import time
+    import numpy as np
+    from src.text2sql_engine import SemanticCache
+
+    vec = np.asarray([1, 0], dtype=np.float32)
+    cache = SemanticCache(ttl=60)
+    cache.add(vec, {"ok": True, "sql": "SELECT 1", "results": [{"n": 1}]}, scope="s")
+    hit = cache.lookup(vec, "s")
+    hit["results"][0]["n"] = 99
+    hit["sql"] = "edited"
+    assert cache.lookup(vec, "s") == {"ok": True, "sql": "SELECT 1", "results": [{"n": 1}]}
+
+    cache.ttl = 0.01
+    time.sleep(0.02)
+    assert cache.lookup(vec, "s") is None
+
+def test_semantic_hit_is_logged_to_history(tmp_path, monkeypatch):
+    import sqlite3
+    import numpy as np
+    from src.history import QueryHistory
+    from src.text2sql_engine import Text2SQLEngine
+
+    engine = Text2SQLEngine(semantic_cache=True)
+    engine.history = QueryHistory(str(tmp_path / "history.db"))
+    monkeypatch.setattr(engine, "_fetch_schema_context", lambda: "schema")
+    monkeypatch.setattr(engine.semantic, "embed", lambda q: np.asarray([1, 0], dtype=np.float32))
+    monkeypatch.setattr(engine, "generate_sql", lambda q: "SELECT 1")
+    # the miss path logs inside _execute; stub it so only the hit writes a row
+    monkeypatch.setattr(engine, "_execute", lambda *a: {"ok": True, "sql": "SELECT 1", "rows": 0, "results": []})
+    engine.run("how many?")
+    assert engine.run("how many?")["sql"] == "SELECT 1"
+    engine.history.close()
+    with sqlite3.connect(tmp_path / "history.db") as conn:
+        assert conn.execute("SELECT question, sql, success FROM history").fetchall() == [("how many?", "SELECT 1", 1)]